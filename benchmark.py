@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+
+# drawing is benchmarked without a real display or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from words import dictionary, prompt
+from engine import Engine, ManualClock
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+  """Registers the decorated function as a benchmark under argument name"""
+  def register(function):
+    BENCHMARKS[name] = function
+    return function
+  return register
+
+
+def measure(function, repeat, number = 1) -> list:
+  """Returns how long one call of argument function takes in seconds, measured repeat times over number calls each"""
+  samples = []
+  for _ in range(repeat):
+    began = time.perf_counter()
+    for _ in range(number):
+      function()
+    samples.append((time.perf_counter() - began)/number)
+  return samples
+
+
+def summarise(samples, unit = "s") -> dict:
+  """Returns the statistical summary of argument samples that is written to the results"""
+  ordered = sorted(samples)
+  return {
+    "unit" : unit,
+    "runs" : len(samples),
+    "mean" : statistics.fmean(samples),
+    "median" : statistics.median(samples),
+    "stdev" : statistics.stdev(samples) if len(samples) > 1 else 0,
+    "min" : ordered[0],
+    "max" : ordered[-1],
+    "p95" : ordered[min(len(ordered) - 1, int(len(ordered)*0.95))],
+  }
+
+
+@benchmark("dictionary")
+def bench_dictionary(repeat) -> dict:
+  tracemalloc.start()
+  words = dictionary()
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del words
+
+  samples = measure(dictionary, max(3, repeat//10))
+  return {
+    "construct" : summarise(samples),
+    "memory" : {"unit" : "bytes", "retained" : current, "peak" : peak},
+  }
+
+
+@benchmark("search_word")
+def bench_search_word(repeat) -> dict:
+  words = dictionary()
+  rng = random.Random(0)
+  hits = [word.upper() for word in rng.sample(words.get_words(), 1000)]
+  misses = [word + "QX" for word in hits]
+
+  results = {}
+  for name, queries in (("hit", hits), ("miss", misses)):
+    samples = measure(lambda: [words.search_word(query) for query in queries], repeat)
+    results[name] = summarise([sample/len(queries) for sample in samples])
+  return results
+
+
+@benchmark("prompt")
+def bench_prompt(repeat) -> dict:
+  prompts = prompt()
+  return {
+    "parse" : summarise(measure(prompt, repeat)),
+    "generate_prompt" : summarise(measure(prompts.generate_prompt, repeat, 10000)),
+  }
+
+
+def make_scene():
+  """Imports the pygame front end and builds everything drawWin needs, with the assets loaded up front"""
+  import pygame
+  import main
+  import pygmtlsv4 as tools
+
+  main.IMAGES.update(main.prepareImages(main.loadImages()))
+  clock = ManualClock()
+  game = Engine(dictionary(), prompt(), clock=clock)
+
+  buttons = tools.Button()
+  buttons.create(pygame.Rect(200, 350, 200, 60), main.BLACK, main.START, text="START", font=main.FONT, textColour=main.WHITE, visible=False)
+
+  bombs = tools.Animation(main.WIDTH/2 - 75 - main.PADDING*0.8, 100, "image", clock=clock)
+  bombs.add_frame(main.IMAGES["bomb1"], duration=main.BOMB_FRAME_DURATION)
+  bombs.add_frame(main.IMAGES["bomb2"], duration=main.BOMB_FRAME_DURATION)
+  explosion = tools.Animation(main.WIDTH/2 - 150, 75, "image", mode="loop", clock=clock)
+  explosion.set_frames(main.IMAGES["explosion"])
+  explosion.set_offsets([[0, 0] for _ in main.IMAGES["explosion"]])
+  explosion.set_durations(main.EXPLOSION_FRAME_DURATION)
+
+  dirty = tools.DirtyRects((main.WIDTH, main.HEIGHT))
+  return main, tools, clock, game, buttons, bombs, explosion, dirty
+
+
+@benchmark("drawWin")
+def bench_draw(repeat) -> dict:
+  main, tools, clock, game, buttons, bombs, explosion, dirty = make_scene()
+
+  game.start()
+  game.input = "EXAMPL"
+  bombs.start()
+  explosion.start()
+
+  def frame(full):
+    clock.advance(1000//main.FPS)
+    if full:
+      dirty.invalidate()
+    main.drawWin(game, buttons, bombs, explosion, dirty)
+
+  results = {
+    "game full" : summarise(measure(lambda: frame(True), repeat, 10)),
+    "game incremental" : summarise(measure(lambda: frame(False), repeat, 10)),
+  }
+
+  game.state = "end"
+  for word in ["EXAMPLE", "PROMPT", "WORD"]:
+    game.stats.solve(word, clock())
+  game.time_used = 23456
+  results["end full"] = summarise(measure(lambda: frame(True), repeat, 10))
+  return results
+
+
+@benchmark("Animation")
+def bench_animation(repeat) -> dict:
+  main, tools, clock, game, buttons, bombs, explosion, dirty = make_scene()
+  explosion.start()
+
+  def advance():
+    clock.advance(1000//main.FPS)
+    explosion.advance()
+
+  return {
+    "advance" : summarise(measure(advance, repeat, 1000)),
+    "draw" : summarise(measure(lambda: explosion.draw(main.WIN), repeat, 100)),
+  }
+
+
+@benchmark("Button")
+def bench_button(repeat) -> dict:
+  import pygame
+  main, tools, *_ = make_scene()
+
+  buttons = tools.Button()
+  ids = []
+  for row in range(20):
+    for column in range(10):
+      rect = pygame.Rect(column*60, row*35, 55, 30)
+      ids.append(buttons.create(rect, main.BLACK, main.START, text=str(row*10 + column), font=main.INPUTFONT, textColour=main.WHITE))
+
+  def check():
+    buttons.check((301, 351))
+    pygame.event.clear(main.START)
+
+  return {
+    "draw 200" : summarise(measure(lambda: buttons.draw(main.WIN), repeat, 10)),
+    "check 200" : summarise(measure(check, repeat, 1000)),
+    "toggleVis" : summarise(measure(lambda: buttons.toggleVis(ids[123]), repeat, 1000)),
+  }
+
+
+def git_commit() -> str:
+  try:
+    return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def compare(results:dict, baseline:dict):
+  """Prints the change in median time of every measurement that is in both result sets"""
+  for group, measurements in results["benchmarks"].items():
+    for name, summary in measurements.items():
+      old = baseline.get("benchmarks", {}).get(group, {}).get(name)
+      if old == None or "median" not in summary or old.get("median", 0) == 0:
+        continue
+      ratio = summary["median"]/old["median"]
+      print(f"{group + ' ' + name:<32} {old['median']*1e6:12.2f} us -> {summary['median']*1e6:12.2f} us  ({ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Word bomb benchmarks")
+  parser.add_argument("-o", "--output", default="benchmark.json", help="where the JSON results are written")
+  parser.add_argument("-r", "--repeat", type=int, default=30, help="samples taken of each measurement")
+  parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="only run these benchmarks")
+  parser.add_argument("--compare", help="earlier results to compare against")
+  arguments = parser.parse_args()
+
+  results = {
+    "commit" : git_commit(),
+    "python" : sys.version,
+    "platform" : platform.platform(),
+    "time" : time.time(),
+    "benchmarks" : {},
+  }
+  for name in arguments.only or BENCHMARKS:
+    print("running", name, file=sys.stderr)
+    results["benchmarks"][name] = BENCHMARKS[name](arguments.repeat)
+
+  with open(arguments.output, "w") as p:
+    json.dump(results, p, indent=2)
+
+  if arguments.compare:
+    with open(arguments.compare) as p:
+      compare(results, json.load(p))
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from words import WORDS_FILE, PROMPT_TABLE_FILE, PROMPT_TABLE_VERSION, PROMPT_TIERS as TIERS
+
+
+def chunks(path, count:int) -> list:
+  """Returns argument count (start, end) byte ranges that split argument path into roughly equal parts"""
+  size = os.path.getsize(path)
+  step = max(1, size//count)
+  return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def read_lines(path, start:int, end:int):
+  """Yields every line that starts in the byte range argument start to argument end of argument path"""
+  with open(path, "rb") as p:
+    if start > 0:
+      # the line the range starts in belongs to the range before, unless the range starts right after a newline
+      p.seek(start - 1)
+      p.readline()
+    while p.tell() < end:
+      line = p.readline()
+      if line == b"":
+        break
+      yield line
+
+
+def count_chunk(path, start:int, end:int, shortest:int, longest:int) -> tuple:
+  """Returns the number of words with each substring between argument shortest and longest letters long, and the word count, for one byte range"""
+  counts = Counter()
+  words = 0
+  for line in read_lines(path, start, end):
+    word = line.strip().lower().decode("ascii", "ignore")
+    if word == "" or not word.isalpha():
+      continue
+    words += 1
+    # a set so a word that contains a substring twice is still only counted once
+    counts.update({word[i:i+length] for length in range(shortest, longest + 1) for i in range(len(word) - length + 1)})
+  return counts, words
+
+
+def calibrate(path = WORDS_FILE, jobs = None, shortest = 2, longest = 4) -> tuple:
+  """
+  This function counts how many words contain every substring of the word list, spread over argument jobs processes
+
+  Each process reads its own byte range of the word list, so nothing is parsed or sent between
+  processes but the counts, and the counts are merged as each range finishes.
+
+  Returns the counts and the number of words.
+  """
+  jobs = jobs or os.cpu_count() or 1
+  counts = Counter()
+  words = 0
+  with ProcessPoolExecutor(jobs) as pool:
+    # a few ranges per process keeps every process busy until the end
+    futures = [pool.submit(count_chunk, path, start, end, shortest, longest) for start, end in chunks(path, jobs*4)]
+    for future in as_completed(futures):
+      partial, found = future.result()
+      counts.update(partial)
+      words += found
+  return counts, words
+
+
+def tier(count:int, tiers = TIERS) -> int:
+  """Returns the tier of a prompt solved by argument count words, or None if it has too few"""
+  for number in range(len(tiers)):
+    if count >= tiers[number]:
+      return number
+  return None
+
+
+def write_table(output, counts:Counter, words:int, tiers = TIERS) -> int:
+  """Writes the prompts with enough solutions to argument output, a text file, easiest first, and returns how many were written"""
+  output.write(f"# word bomb prompt table {PROMPT_TABLE_VERSION} tiers={','.join(map(str, tiers))} words={words}\n")
+  written = 0
+  for text, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+    number = tier(count, tiers)
+    if number == None:
+      break # sorted by count, so every prompt after this has too few solutions as well
+    output.write(f"{text.upper()} {count} {number}\n")
+    written += 1
+  return written
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Counts the solutions of every 2 to 4 letter prompt and writes them out by difficulty")
+  parser.add_argument("-i", "--input", default=WORDS_FILE, help="the word list, one word per line")
+  parser.add_argument("-o", "--output", default=PROMPT_TABLE_FILE, help="where the prompt table is written, - for stdout")
+  parser.add_argument("-j", "--jobs", type=int, default=None, help="processes to count with, every core by default")
+  parser.add_argument("--tiers", default=",".join(map(str, TIERS)), help="the fewest solutions a prompt needs for each tier, easiest first")
+  parser.add_argument("--shortest", type=int, default=2)
+  parser.add_argument("--longest", type=int, default=4)
+  arguments = parser.parse_args()
+
+  tiers = tuple(int(threshold) for threshold in arguments.tiers.split(","))
+  began = time.perf_counter()
+  counts, words = calibrate(arguments.input, arguments.jobs, arguments.shortest, arguments.longest)
+  counted = time.perf_counter() - began
+
+  if arguments.output == "-":
+    written = write_table(sys.stdout, counts, words, tiers)
+  else:
+    temporary = arguments.output + ".tmp"
+    with open(temporary, "w") as p:
+      written = write_table(p, counts, words, tiers)
+    os.replace(temporary, arguments.output)
+  print(f"Counted {len(counts)} substrings of {words} words in {counted:.1f} s, wrote {written} prompts", file=sys.stderr)
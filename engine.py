@@ -0,0 +1,212 @@
+import time
+import random
+
+from stats import GameStats
+
+INITIAL_TIME = 10
+
+MAX_LIVES = 5
+
+# results of submitting a word
+VALID = "valid"
+USED = "used"
+INVALID = "invalid"
+
+# events returned by Engine.update
+LOSE_LIFE = "lose life"
+GAME_OVER = "game over"
+
+
+def monotonic_ms() -> int:
+  """Returns a millisecond timestamp that never goes backwards"""
+  return int(time.monotonic()*1000)
+
+
+class ManualClock:
+  """This class is a clock that only moves when told to, used to run games faster than real time"""
+  def __init__(self, now = 0):
+    self.now = now
+
+  def __call__(self) -> int:
+    return self.now
+
+  def advance(self, ms:int) -> int:
+    """Moves the clock forwards by argument ms milliseconds"""
+    self.now += ms
+    return self.now
+
+
+class Engine:
+  """
+  This class holds the rules and turn state of a game of word bomb
+
+  It does no drawing, plays no sounds and never touches pygame, so it can be driven by the pygame
+  front end, a server or a simulation. Time only moves when update is called, and is read from the
+  clock given to the constructor. Every game reseeds the prompts from a seed, so with the same clock
+  and the same calls a game plays out the same way every time.
+  """
+  def __init__(self, words, prompts, clock = monotonic_ms, initial_time = INITIAL_TIME, max_lives = MAX_LIVES, seed = None, recorder = None):
+    """
+    :param words: the dictionary that submissions are checked against
+    :type words: object with search_word(text) and prefix_cursor() methods
+
+    :param prompts: where prompts are drawn from
+    :type prompts: object with generate_prompt(words_used, lives_lost, used), use(word) and seed(value) methods
+
+    :param clock: returns the current time in milliseconds
+    :type clock: callable
+
+    :param seed: seeds the seeds given to each game, so a whole session can be reproduced
+    :type seed: int
+
+    :param recorder: is told every call that changes the game, to save it to a replay
+    :type recorder: object with a record(time, action, argument) method
+    """
+    self.words = words
+    self.prompts = prompts
+    self.clock = clock
+    self.initial_time = initial_time
+    self.max_lives = max_lives
+    self.random = random.Random(seed)
+    self.recorder = recorder
+    self.seed = None
+    self.cursor = None # follows the input through the dictionary, made once there is a dictionary
+    self.feedback = (None, None, False) # what check_input last found
+
+    self.state = "menu"
+    self.reset()
+
+  def reset(self):
+    """Resets the stats and prompts"""
+    self.prompt = ""
+    self.input = ""
+    self.time_left = self.initial_time*1000
+    self.lives = self.max_lives
+    self.stats = GameStats()
+    self.words_used = self.stats.used
+    self.start_time = 0
+    self.last_tick = 0
+    self.time_used = 0
+
+  def check_input(self) -> tuple:
+    """
+    This function returns what is known about the input so far, updated one letter at a time
+
+    Returns (is the start of a word, is a whole word, contains the prompt). The first two are None
+    until the dictionary has loaded.
+    """
+    if self.cursor == None and self.words != None:
+      self.cursor = self.words.prefix_cursor()
+    if self.cursor == None:
+      self.feedback = (None, None, self.prompt in self.input)
+    else:
+      self.cursor.set(self.input) # only looks up the letters that changed since the last check
+      self.feedback = (self.cursor.is_prefix(), self.cursor.is_word(), self.prompt in self.input)
+    return self.feedback
+
+  def record(self, action:str, argument = ""):
+    """Passes argument action on to the recorder, if there is one"""
+    if self.recorder != None:
+      self.recorder.record(self.clock(), action, str(argument))
+
+  def start(self, seed = None):
+    """Starts a new game, with prompts drawn from argument seed or from a new seed if it is None"""
+    if seed == None:
+      seed = self.random.randrange(2**32)
+    self.reset()
+    self.state = "game"
+    self.seed = seed
+    self.prompts.seed(seed)
+    self.start_time = self.clock()
+    self.last_tick = self.start_time
+    self.record("start", seed)
+    self.new_prompt()
+
+  def go_to_menu(self):
+    self.state = "menu"
+    self.record("menu")
+
+  def new_prompt(self):
+    """Moves on to a new prompt, clearing the input and refilling the timer"""
+    self.prompt = self.prompts.generate_prompt(len(self.words_used), self.max_lives - self.lives, self.words_used)
+    self.input = ""
+    self.time_left = self.initial_time*1000
+    # the new turn's time counts from now, however long ago the last update was
+    self.last_tick = self.clock()
+    self.stats.show(self.prompt, self.last_tick)
+    self.record("prompt", self.prompt)
+
+  def type(self, letter:str):
+    """Adds argument letter to the end of the input"""
+    if self.state == "game":
+      self.input += letter.upper()
+      self.stats.key(self.clock())
+      self.record("type", letter.upper())
+
+  def backspace(self):
+    """Removes the last letter of the input"""
+    if self.state == "game":
+      self.input = self.input[0:-1]
+      self.record("back")
+
+  def set_input(self, text:str):
+    """Replaces the whole input with argument text, used for hints"""
+    if self.state == "game":
+      self.input = text.upper()
+      self.stats.key(self.clock())
+      self.record("input", self.input)
+
+  def submit(self) -> str:
+    """Checks the current input against the prompt and the dictionary, returning VALID, USED or INVALID"""
+    if self.state != "game":
+      return INVALID
+
+    word = self.input
+    self.input = ""
+
+    # checks if user got a valid word
+    if self.words.search_word(word) and (self.prompt in word) and (word not in self.words_used):
+      result = VALID
+
+    # checks if the word has already been used
+    elif word in self.words_used:
+      result = USED
+
+    # else, the word was not in the dictionary and therefore not a valid word
+    else:
+      result = INVALID
+
+    self.record("submit", result)
+    if result == VALID:
+      self.stats.solve(word, self.clock())
+      self.prompts.use(word)
+      self.new_prompt()
+    return result
+
+  def update(self) -> list:
+    """Advances the timer to the current time of the clock and returns a list of the events that happened"""
+    if self.state != "game":
+      return []
+
+    now = self.clock()
+    self.time_left -= now - self.last_tick
+    self.last_tick = now
+
+    if self.time_left <= 0:
+      # only updates that change something are recorded, which is all a replay needs to lose the same lives
+      self.record("update")
+      return self.lose_life()
+    return []
+
+  def lose_life(self) -> list:
+    """Takes a life away, ending the game when none are left, and returns a list of the events that happened"""
+    self.lives -= 1
+    self.stats.fail()
+    if self.lives <= 0:
+      self.state = "end"
+      self.time_left = self.initial_time*1000
+      self.time_used = self.clock() - self.start_time
+      return [LOSE_LIFE, GAME_OVER]
+
+    self.new_prompt()
+    return [LOSE_LIFE]
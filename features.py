@@ -0,0 +1,174 @@
+import os
+import time
+import string
+import hashlib
+
+import numpy
+
+from words import WORDS_FILE, dictionary, words_digest, source_stamp
+
+FEATURES_FILE = "all words features.npz"
+VERSION = 2
+
+LETTERS = string.ascii_lowercase
+ALPHABET = (1 << 26) - 1
+
+
+def letter_mask(letters:str) -> int:
+  """Returns the 26 bit mask of argument letters, bit 0 is a and bit 25 is z, anything that isn't a letter is ignored"""
+  mask = 0
+  for letter in letters.lower():
+    if letter in LETTERS:
+      mask |= 1 << (ord(letter) - 97)
+  return mask
+
+
+def popcount(masks):
+  """Returns the number of bits set in each of argument masks"""
+  if hasattr(numpy, "bitwise_count"):
+    return numpy.bitwise_count(masks)
+  # numpy before 2.0 has no popcount, so the bits are counted in parallel
+  masks = masks - ((masks >> 1) & 0x55555555)
+  masks = (masks & 0x33333333) + ((masks >> 2) & 0x33333333)
+  return (((masks + (masks >> 4)) & 0x0F0F0F0F)*0x01010101 & 0xFFFFFFFF) >> 24
+
+
+class FeatureTable:
+  """
+  This class is a table of features of every word, kept in NumPy arrays for queries over the whole dictionary
+
+  Each word has a 26 bit mask of the letters it uses, its length and its offset into a blob of the
+  words joined by newlines. A query such as "words that only use these letters" is one vectorised
+  operation over the masks that returns an array of word indexes, in the same order as the words
+  the table was built from.
+  """
+  def __init__(self, masks, lengths, offsets, blob):
+    self.masks = masks
+    self.lengths = lengths
+    self.offsets = offsets
+    self.blob = blob
+
+  @classmethod
+  def build(cls, words):
+    """Builds the table over argument words, which are lower case letters"""
+    blob = numpy.frombuffer("".join(word + "\n" for word in words).encode("ascii"), dtype=numpy.uint8)
+    ends = numpy.flatnonzero(blob == ord("\n"))
+    offsets = numpy.zeros(len(ends) + 1, dtype=numpy.uint32)
+    offsets[1:] = ends + 1
+    lengths = (ends - offsets[:-1]).astype(numpy.uint8)
+
+    # every letter's bit, with newlines as 0 so they don't change the mask of the word they end
+    bits = numpy.where(blob == ord("\n"), 0, numpy.left_shift(numpy.uint32(1), (blob.astype(numpy.uint32) - 97) & 31))
+    masks = numpy.bitwise_or.reduceat(bits.astype(numpy.uint32), offsets[:-1].astype(numpy.intp)) if len(ends) > 0 else numpy.zeros(0, dtype=numpy.uint32)
+    return cls(masks.astype(numpy.uint32), lengths, offsets, blob)
+
+  def save(self, path=FEATURES_FILE, source=WORDS_FILE):
+    """Saves the arrays to argument path, uncompressed so loading is a straight read"""
+    temporary = path + ".tmp.npz"
+    # the blob is the words joined the way words_digest hashes them
+    order = hashlib.blake2b(self.blob.tobytes(), digest_size=16).hexdigest()
+    numpy.savez(temporary, version=VERSION, source=numpy.array(source_stamp(source), dtype=numpy.int64), order=order, masks=self.masks, lengths=self.lengths, offsets=self.offsets, blob=self.blob)
+    os.replace(temporary, path)
+
+  @classmethod
+  def load(cls, words, path=FEATURES_FILE, source=WORDS_FILE):
+    """Loads a saved table for argument words, returning None if it is missing or out of date"""
+    try:
+      with numpy.load(path) as data:
+        if int(data["version"]) != VERSION or tuple(data["source"]) != source_stamp(source) or len(data["masks"]) != len(words):
+          return None
+        # rows are in the order of the words the table was built from, so another order needs its own table
+        if str(data["order"]) != words_digest(words):
+          return None
+        return cls(data["masks"], data["lengths"], data["offsets"], data["blob"])
+    except (OSError, ValueError, KeyError):
+      return None
+
+  @classmethod
+  def load_or_build(cls, words, path=FEATURES_FILE, source=WORDS_FILE):
+    """Loads the saved table, rebuilding and saving it if it is missing or out of date"""
+    table = cls.load(words, path, source)
+    if table == None:
+      table = cls.build(words)
+      try:
+        table.save(path, source)
+      except OSError:
+        pass # a read-only install still works, it just rebuilds every launch
+    return table
+
+  def __len__(self):
+    return len(self.masks)
+
+  def __getitem__(self, index):
+    return self.blob[self.offsets[index]:self.offsets[index+1] - 1].tobytes().decode("ascii")
+
+  def get_words(self, indexes) -> list:
+    """Returns the words at argument indexes"""
+    return [self[index] for index in indexes]
+
+  def select(self, only = None, required = None, excluded = None, shortest = None, longest = None):
+    """
+    This function returns a boolean array of the words that match every condition given
+
+    :param only: letters the word may use, no others
+    :type only: str
+
+    :param required: letters the word must use all of
+    :type required: str
+
+    :param excluded: letters the word must not use
+    :type excluded: str
+
+    :param shortest: the fewest letters the word can have
+    :type shortest: int
+
+    :param longest: the most letters the word can have
+    :type longest: int
+    """
+    found = numpy.ones(len(self.masks), dtype=bool)
+    if only != None:
+      found &= (self.masks & (ALPHABET ^ letter_mask(only))) == 0
+    if required != None:
+      mask = letter_mask(required)
+      found &= (self.masks & mask) == mask
+    if excluded != None:
+      found &= (self.masks & letter_mask(excluded)) == 0
+    if shortest != None:
+      found &= self.lengths >= shortest
+    if longest != None:
+      found &= self.lengths <= longest
+    return found
+
+  def query(self, **conditions):
+    """Returns the indexes of the words that match every condition, which are the arguments of select"""
+    return numpy.flatnonzero(self.select(**conditions))
+
+  def count(self, **conditions) -> int:
+    """Returns the number of words that match every condition, which are the arguments of select"""
+    return int(numpy.count_nonzero(self.select(**conditions)))
+
+  def new_letters(self, used:str):
+    """Returns how many letters that aren't in argument used each word has, for the every letter bonus"""
+    return popcount(self.masks & (ALPHABET ^ letter_mask(used)))
+
+  def best_for_letters(self, used:str, limit = 10):
+    """Returns the indexes of the argument limit words that use the most letters not in argument used, most first"""
+    counts = self.new_letters(used)
+    limit = min(limit, len(counts))
+    if limit == 0:
+      return numpy.zeros(0, dtype=numpy.intp)
+    best = numpy.argpartition(-counts.astype(numpy.int32), limit - 1)[:limit]
+    return best[numpy.argsort(-counts[best].astype(numpy.int32), kind="stable")]
+
+
+if __name__ == "__main__":
+  words = dictionary().get_words()
+  began = time.perf_counter()
+  table = FeatureTable.build(words)
+  table.save()
+  built = time.perf_counter() - began
+
+  began = time.perf_counter()
+  FeatureTable.load(words)
+  loaded = time.perf_counter() - began
+  print(f"Built the features of {len(table)} words in {built*1000:.0f} ms, saved to {FEATURES_FILE} ({os.path.getsize(FEATURES_FILE)} bytes), loads in {loaded*1000:.1f} ms")
@@ -1,43 +1,79 @@
+import time
+LAUNCH_TIME = time.perf_counter() # measured from before pygame is imported
+
 import pygame
 import sys
-import re
-import random
 import os
 import math
+import getpass
+import sqlite3
 import pygmtlsv4 as tools
+from words import prompt, WORDS_FILE
+from packed import load_dictionary
+from solver import Solver
+from engine import Engine, MAX_LIVES, VALID, USED, LOSE_LIFE, GAME_OVER
+from replay import Recorder
+from stats import GameStats, StatsStore, NullStatsStore
 
 pygame.init()
 
-WIDTH, HEIGHT = 600, 700
-PROMPT_BOX_WIDTH = 200
-PROMPT_BOX_HEIGHT = 60
-INPUT_BOX_WIDTH = 400
-INPUT_BOX_HEIGHT = 60
-
-INITIAL_TIME = 10
-
-MAX_LIVES = 5
+# every size is designed for a window of DESIGN_WIDTH x DESIGN_HEIGHT, layout scales them to fit the real window
+DESIGN_WIDTH, DESIGN_HEIGHT = 600, 700
 
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+# the window can be any size, the game is drawn on the largest area of it with the designed shape
+pygame.display.set_mode((DESIGN_WIDTH, DESIGN_HEIGHT), pygame.RESIZABLE)
 pygame.display.set_caption("Word bomb")
+VIEW = tools.Viewport((DESIGN_WIDTH, DESIGN_HEIGHT))
 
 image_location = lambda string: os.path.join("images", string)
 sound_location = lambda string: os.path.join("sounds", string)
 
-# all of the images that are used in the game
-HEART = pygame.transform.scale(pygame.image.load(image_location("heart.png")), (70, 70))
-BOMB1 = pygame.transform.scale(pygame.image.load(image_location("bomb1.png")), (150, 150))
-BOMB2 = pygame.transform.scale(pygame.image.load(image_location("bomb2.png")), (150, 150))
-
-# all of the sounds that are used in the game
-EXPLOSION = pygame.mixer.Sound(sound_location("explosion.mp3"))
-TICK = pygame.mixer.Sound(sound_location("tick tock.mp3"))
-TICK.set_volume(0.1)
-LOCKED = pygame.mixer.Sound(sound_location("locked.mp3"))
-BEEP = pygame.mixer.Sound(sound_location("beep.mp3"))
-BEEP.set_volume(0.3)
-ERROR = pygame.mixer.Sound(sound_location("error.mp3"))
-ERROR.set_volume(0.2)
+EXPLOSION_FRAMES = range(4, 13)
+
+# all of the images and sounds that are used in the game, filled in once the loader has loaded them
+ASSETS = tools.Assets()
+IMAGES = {}
+SOUNDS = {}
+
+def loadImages() -> dict:
+  """Decodes all of the images that are used in the game, at the size they are saved at"""
+  images = {
+    "heart" : pygame.image.load(image_location("heart.png")),
+    "bomb1" : pygame.image.load(image_location("bomb1.png")),
+    "bomb2" : pygame.image.load(image_location("bomb2.png")),
+  }
+  for x in EXPLOSION_FRAMES:
+    images["explosion " + str(x)] = pygame.image.load(os.path.join("explosion", str(x) + ".png"))
+  return images
+
+def prepareImages(images:dict) -> dict:
+  """Converts argument images to the display's format once and returns them at the size they are drawn"""
+  for name, surface in images.items():
+    ASSETS.add(name, surface)
+  return scaleImages()
+
+def scaleImages() -> dict:
+  """Returns the images at the size they are drawn at the current scale, scaled copies are kept for each size used"""
+  return {
+    "heart" : ASSETS.get("heart", (HEART_SIZE, HEART_SIZE)),
+    "bomb1" : ASSETS.get("bomb1", (BOMB_SIZE, BOMB_SIZE)),
+    "bomb2" : ASSETS.get("bomb2", (BOMB_SIZE, BOMB_SIZE)),
+    "explosion" : [ASSETS.get("explosion " + str(x), (EXPLOSION_SIZE, EXPLOSION_SIZE)) for x in EXPLOSION_FRAMES],
+  }
+
+def loadSounds() -> dict:
+  """Decodes all of the sounds that are used in the game"""
+  sounds = {
+    "explosion" : pygame.mixer.Sound(sound_location("explosion.mp3")),
+    "tick" : pygame.mixer.Sound(sound_location("tick tock.mp3")),
+    "locked" : pygame.mixer.Sound(sound_location("locked.mp3")),
+    "beep" : pygame.mixer.Sound(sound_location("beep.mp3")),
+    "error" : pygame.mixer.Sound(sound_location("error.mp3")),
+  }
+  sounds["tick"].set_volume(0.1)
+  sounds["beep"].set_volume(0.3)
+  sounds["error"].set_volume(0.2)
+  return sounds
 
 # general colours
 BLACK =  (  0,   0,   0)
@@ -55,281 +91,473 @@ DBROWN = (159, 100,  64)
 
 # useful constants
 DURATION = 200 #ms
-PADDING = 20
+BOMB_FRAME_DURATION = 180 #ms
+EXPLOSION_FRAME_DURATION = 80 #ms
 FPS = 60
 
-# fonts
-FONT = pygame.font.SysFont("consolas.ttf", 50)
-INPUTFONT = pygame.font.SysFont("consolas.ttf", 30)
+# the highest frame rate in each state, the loop sleeps until something happens when nothing is moving
+FRAME_CAPS = {"menu" : 30, "game" : FPS, "end" : 30}
+
+# fonts of each size used, so going back to a window size doesn't load them again
+FONTS = {}
+
+def getFont(size:int) -> pygame.font.Font:
+  if size not in FONTS:
+    FONTS[size] = pygame.font.SysFont("consolas.ttf", size)
+  return FONTS[size]
 
 # USEREVENTS that are called in the program
 START = pygame.USEREVENT + 1
-GENERATE_PROMPT = pygame.USEREVENT + 2
-RESET_INPUT = pygame.USEREVENT + 3
-LOSE_LIFE = pygame.USEREVENT + 4
 RESTART = pygame.USEREVENT + 5
 PLAY_EXPLOSION = pygame.USEREVENT + 6
 GO_TO_MENU = pygame.USEREVENT + 7
+LOADING = pygame.USEREVENT + 8
+LOADED = pygame.USEREVENT + 9
 
 
-class dictionary:
-  """This class holds all of the words in the chosen dictionary"""
-  def __init__(self):
-    with open("all words - sowpods + enable 1.txt") as p:
-      self.words = p.read().split("\n")
-  def get_words(self) -> list:
-    """Returns a list of all words"""
-    return self.words
+def layout():
+  """Sizes and places everything for the canvas of the viewport, which is the designed size times VIEW.scale"""
+  global WIN, SCALE, WIDTH, HEIGHT, PADDING, PROMPT_BOX_WIDTH, PROMPT_BOX_HEIGHT, INPUT_BOX_WIDTH, INPUT_BOX_HEIGHT
+  global HEART_SIZE, BOMB_SIZE, EXPLOSION_SIZE, FONT, INPUTFONT, PROFILER_POSITION
+  global PROMPT_RECT, INPUT_RECT, HEARTS_RECT, STATS_RECT, USED_RECT
   
-  def search_word(self, text:str) -> bool:
-    """Returns a bool value depending on if argument text is in the dictionary"""
-    text = text.lower()
-    for word in self.words:
-      if text == word:
-        return True
-    return False
-
-class prompt:
-  """This class holds all possible prompts"""
-  def __init__(self):
-    with open("prompts.txt") as p:
-      self.prompts = p.read()
-      
-      # removes any bracketed information
-      self.prompts = re.sub("[\(\[].*?[\)\]]", "", self.prompts) # i have no idea what this function is doing :/
-      self.prompts = self.prompts.split("\n")
-      
-      #removes whitespace
-      for prompt in range(len(self.prompts)):
-        self.prompts[prompt] = self.prompts[prompt].strip()
-      
-  def get_prompts(self) -> list:
-    """returns all possible prompts"""
-    return self.prompts
+  WIN = VIEW.canvas
+  SCALE = VIEW.scale
+  size = lambda designed: max(1, round(designed*SCALE))
+  
+  WIDTH, HEIGHT = WIN.get_size()
+  PADDING = size(20)
+  PROMPT_BOX_WIDTH = size(200)
+  PROMPT_BOX_HEIGHT = size(60)
+  INPUT_BOX_WIDTH = size(400)
+  INPUT_BOX_HEIGHT = size(60)
+  
+  HEART_SIZE = size(70)
+  BOMB_SIZE = size(150)
+  EXPLOSION_SIZE = size(300)
   
-  def generate_prompt(self) -> str:
-    """Returns a random item from the list"""
-    return self.prompts[random.randrange(0, len(self.prompts))]
+  FONT = getFont(size(50))
+  INPUTFONT = getFont(size(30))
+  
+  PROMPT_RECT = pygame.Rect(WIDTH/2 - PROMPT_BOX_WIDTH/2, HEIGHT/2 - PROMPT_BOX_HEIGHT/2, PROMPT_BOX_WIDTH, PROMPT_BOX_HEIGHT)
+  INPUT_RECT = pygame.Rect(WIDTH/2 - INPUT_BOX_WIDTH/2, HEIGHT - PADDING - INPUT_BOX_HEIGHT, INPUT_BOX_WIDTH, INPUT_BOX_HEIGHT)
+  HEARTS_RECT = pygame.Rect(WIDTH - MAX_LIVES*(HEART_SIZE+PADDING/2), PADDING/2, MAX_LIVES*(HEART_SIZE+PADDING/2), HEART_SIZE)
+  STATS_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT/2)
+  USED_RECT = pygame.Rect(PADDING, HEIGHT/2 + PADDING*4, WIDTH - PADDING*2, HEIGHT/2 - PADDING*5)
+  PROFILER_POSITION = (PADDING, PADDING*5)
+
+layout()
+
+
+def buttonRects() -> tuple:
+  """Returns where the START and MENU buttons go"""
+  width = WIDTH/3
+  height = PADDING*3
+  return pygame.Rect(WIDTH/2-width/2, HEIGHT/2, width, height), pygame.Rect(WIDTH/2-width/2-1, HEIGHT/2, width, height)
 
+def makeUsedWords() -> tools.Scroll:
+  """Returns the scroll that every word used is listed in on the end screen"""
+  return tools.Scroll(USED_RECT.x, USED_RECT.y, USED_RECT.width, USED_RECT.height, 0, max(1, round(10*SCALE)), BLACK)
 
-def drawWin(state:str, buttons:tools.Button, user_prompt:str, user_input:str, time_left:int, lives:int, bombs:tools.Animation, explosion:tools.Animation, words_used:list, time_used:int):
-  """Any changes to the window ("drawing") is done in this function"""
+def placeAnimations(bombs:tools.Animation, explosion:tools.Animation):
+  """Moves the animations to where they go and gives them their frames at the current size, once the images have loaded"""
+  x, y = WIDTH/2 - BOMB_SIZE/2 - PADDING*0.8, 100*SCALE
+  bombs.set_coords(x, y, x, y)
+  x, y = WIDTH/2 - EXPLOSION_SIZE/2, 75*SCALE
+  explosion.set_coords(x, y, x, y)
+  if IMAGES != {}:
+    bombs.set_frames([IMAGES["bomb1"], IMAGES["bomb2"]], bombs.durations)
+    explosion.set_frames(IMAGES["explosion"], explosion.durations)
+
+
+def centredTextRect(font, text:str, centre) -> pygame.Rect:
+  """Returns the area text would cover if drawn centred on argument centre, without rendering it"""
+  rect = pygame.Rect((0, 0), font.size(text))
+  rect.center = centre
+  return rect
+
+def drawPrompt(user_prompt:str):
+  # displays user prompt
+  text = tools.textCache.render(FONT, user_prompt, 1, WHITE)
+  pygame.draw.rect(WIN, GREEN, PROMPT_RECT, border_radius = PROMPT_BOX_HEIGHT//2)
+  WIN.blit(text, ((WIDTH - text.get_width())/2, (HEIGHT - text.get_height())/2))
+
+def drawInput(user_input:str, feedback:tuple):
+  #displays user input, red if no word starts with it, outlined once it has the prompt and filled once it is a word as well
+  prefix, word, contains = feedback if user_input != "" else (None, None, False)
+  text = tools.textCache.render(INPUTFONT, user_input, 1, RED if prefix == False else WHITE)
+  pygame.draw.rect(WIN, DGREEN if word and contains else BLACK, INPUT_RECT, border_radius = INPUT_BOX_HEIGHT//2)
+  if contains:
+    pygame.draw.rect(WIN, GREEN, INPUT_RECT, 3, border_radius = INPUT_BOX_HEIGHT//2)
+  WIN.blit(text, ((WIDTH - text.get_width())/2, HEIGHT - PADDING - INPUT_BOX_HEIGHT/2 - text.get_height()/2))
+
+def drawTimer(seconds:str):
+  # displays time left
+  text = tools.textCache.render(FONT, seconds, 1, WHITE)
+  WIN.blit(text, (PADDING, PADDING))
+
+def drawHearts(lives:int):
+  # displays how many lives the user has left
+  for heart in range(lives+1):
+    WIN.blit(IMAGES["heart"], (WIDTH-heart*(HEART_SIZE+PADDING/2), PADDING/2))
+
+def drawStats(stats:GameStats, time_used:int, best:int):
+  # displays all statistics gathered over the course of the game, with a dash for averages of nothing
+  average = lambda running, scale: f"{running.mean/scale:.2f}" if running.count > 0 else "-"
+  lines = [
+    f"Number of words used: {stats.words} (best {max(best, stats.words)})",
+    f"Time used: {time_used//1000} seconds",
+    f"Average time per word: {math.ceil((time_used//1000)/stats.words*100)/100 if stats.words > 0 else '-'} seconds",
+    f"Average word length: {average(stats.length, 1)} characters",
+    f"Average reaction time: {average(stats.reaction, 1000)} seconds",
+  ]
+  for line in range(len(lines)):
+    text = tools.textCache.render(INPUTFONT, lines[line], 1, WHITE)
+    WIN.blit(text, (PADDING, PADDING*(line+1)+text.get_height()*line))
+
+
+def listWords(scroll:tools.Scroll, words):
+  # lays the words used out in columns, the scroll only ever draws the rows that are in view
+  scroll.clear()
+  columns = 2
+  width = (scroll.width - scroll.scrollbarWidth - PADDING)//columns
+  height = INPUTFONT.get_linesize()
+  for index, word in enumerate(words):
+    text = INPUTFONT.render(word, 1, WHITE) # kept by the scroll, so not worth a place in the text cache
+    scroll.blit(text, (PADDING//2 + (index % columns)*width, PADDING//2 + (index//columns)*height))
+
+
+NO_PROFILER = tools.NullProfiler()
+
+
+def loadBest(store:StatsStore, player:str) -> int:
+  """Returns the most words argument player has used in one game, 0 if the stats can't be read"""
+  try:
+    return store.best(player)
+  except sqlite3.Error:
+    return 0
+
+
+def drawWin(game:Engine, buttons:tools.Button, bombs:tools.Animation, explosion:tools.Animation, dirty:tools.DirtyRects, profiler = NO_PROFILER, best = 0, usedWords = None):
+  """
+  Any changes to the window ("drawing") is done in this function
   
-  pygame.draw.rect(WIN, DGREY, pygame.Rect(0, 0, WIDTH, HEIGHT)) # blank canvas
+  Only the areas of elements that changed since the last frame are redrawn and pushed to the display
+  """
   
-  if state == "game":
-    # displays user prompt
-    text = FONT.render(user_prompt, 1, WHITE)
-    rect = pygame.Rect(WIDTH/2 - PROMPT_BOX_WIDTH/2, HEIGHT/2 - PROMPT_BOX_HEIGHT/2, PROMPT_BOX_WIDTH, PROMPT_BOX_HEIGHT)
-    pygame.draw.rect(WIN, GREEN, rect, border_radius = PROMPT_BOX_HEIGHT//2)
-    WIN.blit(text, ((WIDTH - text.get_width())/2, (HEIGHT - text.get_height())/2))
-    
-    #displays user input
-    text = INPUTFONT.render(user_input, 1, WHITE)
-    rect = pygame.Rect(WIDTH/2 - INPUT_BOX_WIDTH/2, HEIGHT - PADDING - INPUT_BOX_HEIGHT, INPUT_BOX_WIDTH, INPUT_BOX_HEIGHT)
-    pygame.draw.rect(WIN, BLACK, rect, border_radius = INPUT_BOX_HEIGHT//2)
-    WIN.blit(text, ((WIDTH - text.get_width())/2, HEIGHT - PADDING - INPUT_BOX_HEIGHT/2 - text.get_height()/2))
-    
-    # displays time left
-    text = str((time_left//1000) + 1)
-    text = FONT.render(text, 1, WHITE)
-    WIN.blit(text, (PADDING, PADDING))
-    
-    # displays how many lives the user has left
-    for heart in range(lives+1):
-      WIN.blit(HEART, (WIDTH-heart*(HEART.get_width()+PADDING/2), PADDING/2))
+  # every element in the order it is drawn, with what it looks like this frame, the area it covers and how to draw it
+  layers = []
+  
+  if game.state == "game":
+    seconds = str((game.time_left//1000) + 1)
+    layers += [
+      ("prompt", game.prompt, PROMPT_RECT.union(centredTextRect(FONT, game.prompt, PROMPT_RECT.center)), lambda: drawPrompt(game.prompt)),
+      ("input", (game.input, game.feedback), INPUT_RECT.union(centredTextRect(INPUTFONT, game.input, INPUT_RECT.center)), lambda: drawInput(game.input, game.feedback)),
+      ("timer", seconds, pygame.Rect((PADDING, PADDING), FONT.size(seconds)), lambda: drawTimer(seconds)),
+      ("hearts", game.lives, HEARTS_RECT, lambda: drawHearts(game.lives)),
       
-    # draws the animations of the bomb and explosion
-    bombs.play(WIN, True, False)
-    explosion.play(WIN, True, auto_stop = True)
+      # draws the animations of the bomb and explosion
+      ("bombs", (bombs.state, id(bombs.frames[bombs.current])), bombs.get_rect(), lambda: bombs.draw(WIN)),
+      ("explosion", (explosion.state, id(explosion.frames[explosion.current])), explosion.get_rect(), lambda: explosion.draw(WIN)),
+    ]
     
-  if state == "end":
-    
-    # displays all statistics gathered over the course of the game
-    text = INPUTFONT.render(f"Number of words used: {len(words_used)}", 1, WHITE)
-    WIN.blit(text, (PADDING, PADDING))
-    text = INPUTFONT.render(f"Time used: {time_used//1000} seconds", 1, WHITE)
-    WIN.blit(text, (PADDING, PADDING*2+text.get_height()))
-    average = math.ceil((time_used//1000)/len(words_used)*100)/100
-    text = INPUTFONT.render(f"Average time per word: {average} seconds", 1, WHITE)
-    WIN.blit(text, (PADDING, PADDING*3+text.get_height()*2))
-    text = INPUTFONT.render(f"Average word length: {int(sum( map(len, words_used) ) / len(words_used))} characters", 1, WHITE)
-    WIN.blit(text, (PADDING, PADDING*4+text.get_height()*3))
+  if game.state == "end":
+    layers.append(("stats", (game.stats.words, game.time_used, best), STATS_RECT, lambda: drawStats(game.stats, game.time_used, best)))
+    if usedWords != None:
+      usedWords.refresh()
+      layers.append(("used words", usedWords.version, usedWords.rect, lambda: usedWords.draw(WIN)))
     
   # draws any of the displayed buttons
-  buttons.draw(WIN)
-  pygame.display.flip()
+  # a union starting from an empty rect would still stretch to the origin
+  rects = buttons.get_visible_rects()
+  area = rects[0].unionall(rects[1:]) if rects != [] else pygame.Rect(0, 0, 0, 0)
+  layers.append(("buttons", buttons.version, area, lambda: buttons.draw(WIN)))
+  
+  # the profiling overlay goes on top of everything and changes every frame
+  if profiler.hud:
+    profiler.refresh()
+    layers.append(("profiler", profiler.frames, profiler.get_rect(PROFILER_POSITION), lambda: profiler.draw(WIN, PROFILER_POSITION)))
+  
+  # changing screen redraws everything
+  dirty.track("state", game.state, dirty.screen)
+  for name, key, rect, draw in layers:
+    dirty.track(name, key, rect)
+    
+  regions = dirty.regions()
+  for region in regions:
+    WIN.set_clip(region)
+    pygame.draw.rect(WIN, DGREY, region) # blank canvas
+    for name, key, rect, draw in layers:
+      if rect.colliderect(region):
+        with profiler.span(name):
+          draw()
+  WIN.set_clip(None)
+  with profiler.span("display update"):
+    dirty.update(VIEW.present(regions))
+  
+  # animations only move on once their frame has been drawn
+  if game.state == "game":
+    bombs.advance()
+    explosion.advance()
 
 
 def main():
 
   buttons = tools.Button()
 
-  width = WIDTH/3
-  height = PADDING*3  
-  start_rect = pygame.Rect(WIDTH/2-width/2, HEIGHT/2, width, height)
-  menu_rect = pygame.Rect(WIDTH/2-width/2-1, HEIGHT/2, width, height)
+  start_rect, menu_rect = buttonRects()
   
-  buttons.create(start_rect, BLACK, START, text="START", font=FONT, textColour=WHITE)
-  buttons.create(menu_rect, BLACK, GO_TO_MENU, text="MENU", font=FONT, textColour=WHITE, visible=False)
+  # START stays greyed out until everything a game needs has loaded
+  start_button = buttons.create(start_rect, DGREY, LOADING, text="LOADING", font=INPUTFONT, textColour=GREY, outlineWidth=2, outlineColour=GREY)
+  menu_button = buttons.create(menu_rect, BLACK, GO_TO_MENU, text="MENU", font=FONT, textColour=WHITE, visible=False)
   
-  prompts = prompt()
-  dict = dictionary()
+  # every word used is listed on the end screen
+  usedWords = makeUsedWords()
   
   # creates animation class for the bomb which alternates between a) 2 images b) slowly
-  bombs = tools.Animation(WIDTH/2 - 75 - PADDING*0.8, 100, "image")
+  bombs = tools.Animation(0, 0, "image")
+  
+  # creates animation class for the explosion which is a sequence of a) 9 images b) quickly, played once
+  explosion = tools.Animation(0, 0, frame_type="image", mode="once")
+  placeAnimations(bombs, explosion)
   
-  # a
-  bombs.add_frame(BOMB1)
-  bombs.add_frame(BOMB2)
+  # finished games are saved in the background, under --player <name> or the name of whoever is logged in
+  # stats are optional, so a read-only install or a database sqlite can't open still plays, it just keeps nothing
+  player = sys.argv[sys.argv.index("--player") + 1] if "--player" in sys.argv else getpass.getuser()
+  try:
+    store = StatsStore()
+  except sqlite3.Error:
+    store = NullStatsStore()
+  best = 0
   
-  # b
-  bombs.duplicate_all_frames(10)
+  # the heavy loading is done in the background while the menu is already showing
+  loader = tools.Loader(event=LOADED)
+  loader.add("images", loadImages)
+  loader.add("sounds", loadSounds)
+  loader.add("dictionary", load_dictionary)
+  loader.add("prompts", lambda: prompt(source=WORDS_FILE)) # sorted by difficulty with the solution counts saved the first time
+  loader.add("best", loadBest, store, player)
+  loader.start()
+  loaded = False
   
-  # creates animation class for the explosion which is a sequence of a) 9 images b) quickly
-  explosion = tools.Animation(WIDTH/2 - 150, 75, frame_type="image")
+  # the solver behind tab's hints needs the substring index, so it is only loaded in the background the first time tab is pressed
+  hints = tools.Loader(event=LOADED)
+  hints.add("solver", lambda: Solver(loader.wait("dictionary")))
+  wantHint = False
   
-  # a
-  explosion.set_frames(
-    [pygame.transform.scale( # ensures all correct size
-      pygame.image.load(os.path.join("explosion", str(x) + ".png")), # loads images
-      (300, 300)) for x in range(4, 13)]) # for all frames
-  explosion.set_offsets([[0, 0] for _ in range(4, 13)])
+  # all of the game rules live in the engine, this loop only turns pygame events into calls to it
+  # the dictionary is handed over once it has loaded, it isn't needed until the first word is submitted
+  game = Engine(None, None, clock=pygame.time.get_ticks)
   
-  # b
-  explosion.duplicate_all_frames(4)
+  # python main.py --record session.log saves every game played so it can be played back with replay.py
+  if "--record" in sys.argv:
+    game.recorder = Recorder(sys.argv[sys.argv.index("--record") + 1], game.initial_time, game.max_lives)
   
-  state = "menu"
-  user_prompt = ""
-  user_input = ""
-  time_left = INITIAL_TIME*1000
-  last_decrement_time = 0
-  lives = MAX_LIVES
-  words_used = []
-
-  #initiates the clock
-  clock = pygame.time.Clock()
+  timings = "--timings" in sys.argv
   
-  time_used = 0
+  # python main.py --profile times each phase of the loop, shows an overlay (F3 hides it) and writes trace.json on exit
+  profiler = tools.Profiler() if "--profile" in sys.argv else NO_PROFILER
+  first_frame = True
+
+  # keeps track of which parts of the window need redrawing
+  dirty = tools.DirtyRects((WIDTH, HEIGHT))
+
+  #initiates the clock, which only runs at full speed while something is moving
+  pacer = tools.FramePacer(FRAME_CAPS, default=FPS)
 
   #initiates game loop
   run = True
   while run:
     
-    #ticks the clock
-    clock.tick(FPS)
-    
-    if time_left <= 0:
-      pygame.event.post(pygame.event.Event(LOSE_LIFE))
+    #ticks the clock, or sleeps until an event arrives if nothing on screen is moving
+    animating = game.state == "game" or bombs.state == "playing" or explosion.state == "playing"
+    with profiler.span("wait"):
+      events = pacer.wait(game.state, animating)
     
-    if state == "game":
-      time_left -= pygame.time.get_ticks() - last_decrement_time
-      last_decrement_time = pygame.time.get_ticks()
+    # enables START once everything it needs has loaded
+    if not loaded and loader.ready("prompts", "images", "sounds"):
+      loaded = True
+      IMAGES.update(prepareImages(loader.get("images"))) # converted here as the display belongs to this thread
+      SOUNDS.update(loader.get("sounds"))
+      game.prompts = loader.get("prompts")
       
+      # a, b
+      bombs.add_frame(IMAGES["bomb1"], duration=BOMB_FRAME_DURATION)
+      bombs.add_frame(IMAGES["bomb2"], duration=BOMB_FRAME_DURATION)
+      
+      # a
+      explosion.set_frames(IMAGES["explosion"])
+      explosion.set_offsets([[0, 0] for _ in IMAGES["explosion"]])
+      
+      # b
+      explosion.set_durations(EXPLOSION_FRAME_DURATION)
+      
+      buttons.changeAttr(start_button, "colour", BLACK)
+      buttons.changeAttr(start_button, "outlineWidth", 0)
+      buttons.changeAttr(start_button, "font", FONT)
+      buttons.changeAttr(start_button, "textColour", WHITE)
+      buttons.changeAttr(start_button, "text", "START")
+      buttons.changeAttr(start_button, "event", START)
+      
+      if timings:
+        print(f"Ready to start after {(time.perf_counter() - LAUNCH_TIME)*1000:.0f} ms")
+        
+    if best == 0 and loader.ready("best"):
+      best = max(best, loader.get("best"))
+    
+    if game.words == None and loader.ready("dictionary"):
+      game.words = loader.get("dictionary")
+      if timings:
+        print(f"Dictionary ready after {(time.perf_counter() - LAUNCH_TIME)*1000:.0f} ms")
+        for name, seconds in loader.times.items():
+          print(f"  {name}: {seconds*1000:.0f} ms")
+    
+    # gives the hint tab asked for as soon as the solver has loaded
+    if wantHint and hints.ready("solver"):
+      wantHint = False
+      if game.state == "game":
+        game.set_input(hints.get("solver").hint(game.prompt, game.words_used))
+        game.check_input()
+    
+    with profiler.span("update"):
+      outcomes = game.update()
+    for outcome in outcomes:
+      if outcome == LOSE_LIFE:
+        SOUNDS["explosion"].play()
+        if game.state == "game":
+          pygame.event.post(pygame.event.Event(PLAY_EXPLOSION))
+        
+      elif outcome == GAME_OVER:
+        buttons.toggleVis(menu_button)
+        store.save(player, game.stats, game.time_used, game.seed)
+        listWords(usedWords, game.words_used)
+        
+        # ends animations
+        bombs.stop()
+        explosion.set_current_frame(0)
+        explosion.stop()
+        SOUNDS["tick"].stop() # the tick is set to repeat continually so has to be told to stop playing
 
-    #gets mouse position
-    mouse = pygame.mouse.get_pos()
+    #gets mouse position, on the canvas rather than the window
+    mouse = VIEW.to_canvas(pygame.mouse.get_pos())
     
-    #for everything that the user has inputted ...
-    for event in pygame.event.get():
+    with profiler.span("events"):
+      #for everything that the user has inputted ...
+      for event in events:
 
-      #if the "x" button is pressed ...
-      if event.type == pygame.QUIT:
+        #if the "x" button is pressed ...
+        if event.type == pygame.QUIT:
 
-        #ends game loop
-        run = False
+          #ends game loop
+          run = False
+        
+          if profiler.enabled:
+            profiler.export("trace.json")
+          
+          if game.recorder != None:
+            game.recorder.close()
+          store.close()
 
-        #terminates pygame
-        pygame.quit()
+          #terminates pygame
+          pygame.quit()
 
-        #terminates system
-        sys.exit()
+          #terminates system
+          sys.exit()
         
-      elif event.type == pygame.MOUSEBUTTONUP:
-        buttons.check(mouse)  # checks if any of the buttons were clicked
+        elif event.type == pygame.WINDOWEXPOSED:
+          dirty.invalidate() # the window was uncovered so nothing on it can be trusted
         
-      elif event.type == pygame.KEYDOWN:
-        if state == "game":
-          # checks if a character key is pressed
-          if 97 <= event.key <= 122:
-            inputted = event.key - 32
-            user_input += chr(inputted)
-            
-          if event.key == pygame.K_BACKSPACE:
-            if user_input != "":
-              user_input = user_input[0:-1]
-              
-          if event.key == pygame.K_RETURN:
-            # checks if user got a valid word
-            if dict.search_word(user_input) and (user_prompt in user_input) and (user_input not in words_used):
-              pygame.event.post(pygame.event.Event(GENERATE_PROMPT))
-              pygame.event.post(pygame.event.Event(RESET_INPUT))
-              time_left = INITIAL_TIME*1000
-              words_used.append(user_input)
-              BEEP.play()
-            
-            # checks if the word has already been used
-            elif user_input in words_used:
-              LOCKED.play()
-              pygame.event.post(pygame.event.Event(RESET_INPUT))
-            
-            # else, the word was not in the dictionary and therefore not a valid word
-            else:
-              ERROR.play()
-              pygame.event.post(pygame.event.Event(RESET_INPUT))
-
-      elif event.type == START:
-        # resets the stats and prompts
-        user_prompt = ""
-        user_input = ""
+        elif event.type == pygame.VIDEORESIZE:
+          # everything is laid out again at the new size, with the images scaled once for it
+          VIEW.resize()
+          layout()
+          if loaded:
+            IMAGES.update(scaleImages())
+          placeAnimations(bombs, explosion)
+          
+          start_rect, menu_rect = buttonRects()
+          buttons.changeAttr(start_button, "rect", start_rect)
+          buttons.changeAttr(start_button, "font", FONT if loaded else INPUTFONT)
+          buttons.changeAttr(menu_button, "rect", menu_rect)
+          buttons.changeAttr(menu_button, "font", FONT)
+          
+          usedWords = makeUsedWords()
+          if game.state == "end":
+            listWords(usedWords, game.words_used)
+          dirty = tools.DirtyRects((WIDTH, HEIGHT))
         
-        lives = MAX_LIVES
-        words_used = []
-        start_time = pygame.time.get_ticks()
-        buttons.toggleVis(start_rect)
-        state = "game"
-        pygame.event.post(pygame.event.Event(GENERATE_PROMPT))
-        last_decrement_time = pygame.time.get_ticks()
+        elif event.type == pygame.MOUSEBUTTONUP:
+          buttons.check(mouse)  # checks if any of the buttons were clicked
+          usedWords.checkMouseUp(mouse)
         
-        bombs.start()
-        TICK.play(-1)
+        elif event.type == pygame.MOUSEBUTTONDOWN and game.state == "end":
+          usedWords.checkMouseDown(mouse)
         
-      elif event.type == GENERATE_PROMPT:
-        user_prompt = prompts.generate_prompt()
+        elif event.type == pygame.MOUSEMOTION and game.state == "end":
+          usedWords.checkMouseMotion(mouse)
         
-      elif event.type == RESET_INPUT:
-        user_input = ""
+        elif event.type == pygame.MOUSEWHEEL and game.state == "end":
+          usedWords.checkScroll(event)
         
-      elif event.type == LOSE_LIFE:
-        EXPLOSION.play()
-        lives -= 1
-        if lives <= 0:
-          state = "end"
-          time_left = INITIAL_TIME*1000
-          last_decrement_time = 0
-          time_used = pygame.time.get_ticks() - start_time
+        elif event.type == pygame.KEYDOWN:
+          if event.key == pygame.K_F3:
+            profiler.toggle_hud()
+            dirty.invalidate()
           
-          buttons.toggleVis(menu_rect)
-          
-          # ends animations
-          bombs.stop()
-          explosion.set_current_frame(0)
-          explosion.stop()
-          TICK.stop() # TICK is set to repeat continually so has to be told to stop playing
-        else:
-          pygame.event.post(pygame.event.Event(PLAY_EXPLOSION))
-          pygame.event.post(pygame.event.Event(GENERATE_PROMPT))
-          pygame.event.post(pygame.event.Event(RESET_INPUT))
-          time_left = INITIAL_TIME*1000
+          if game.state == "game":
+            # checks if a character key is pressed
+            if 97 <= event.key <= 122:
+              game.type(chr(event.key))
+            
+            if event.key == pygame.K_BACKSPACE:
+              game.backspace()
+              
+            # tab swaps the input for a word that would be accepted
+            if event.key == pygame.K_TAB:
+              wantHint = True
+              if hints.thread == None:
+                hints.start()
+            
+            # checks the input against the dictionary as it is typed, one letter at a time
+            if event.key != pygame.K_RETURN:
+              game.check_input()
+              
+            if event.key == pygame.K_RETURN:
+              if game.words == None:
+                game.words = loader.wait("dictionary") # only happens if a word is entered within moments of starting
+              with profiler.span("search_word"):
+                result = game.submit()
+              if result == VALID:
+                SOUNDS["beep"].play()
+              elif result == USED:
+                SOUNDS["locked"].play()
+              else:
+                SOUNDS["error"].play()
+
+        elif event.type == START:
+          game.start()
+          buttons.toggleVis(start_button)
+        
+          bombs.start()
+          SOUNDS["tick"].play(-1)
       
-      elif event.type == PLAY_EXPLOSION:
-        explosion.start()
+        elif event.type == PLAY_EXPLOSION:
+          explosion.start()
         
-      elif event.type == GO_TO_MENU:
-        state = "menu"
-        buttons.toggleVis(menu_rect)
-        buttons.toggleVis(start_rect)
+        elif event.type == GO_TO_MENU:
+          best = max(best, game.stats.words)
+          game.go_to_menu()
+          buttons.toggleVis(menu_button)
+          buttons.toggleVis(start_button)
 
-    drawWin(state, buttons, user_prompt, user_input, time_left, lives, bombs, explosion, words_used, time_used)
+    with profiler.span("draw"):
+      drawWin(game, buttons, bombs, explosion, dirty, profiler, best, usedWords)
+    profiler.frame()
+    
+    if first_frame:
+      first_frame = False
+      if timings:
+        print(f"First frame after {(time.perf_counter() - LAUNCH_TIME)*1000:.0f} ms")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,278 @@
+import os
+import re
+import sys
+import mmap
+import struct
+import bisect
+import hashlib
+from array import array
+
+from words import WORDS_FILE, dictionary, PrefixCursor, SubstringIndex, source_stamp
+
+PACKED_FILE = "all words.packed"
+
+# magic, version, word count, blob length, source size, source mtime
+HEADER = struct.Struct("<4sIIIQQ")
+MAGIC = b"WBPK"
+VERSION = 1
+
+
+def pack(source=WORDS_FILE, destination=PACKED_FILE) -> int:
+  """
+  This function converts a plain text word list into the packed format and returns the number of words written
+
+  The packed file is a header, a table of count+1 little endian uint32 offsets and a blob of the sorted
+  words, each followed by a newline. Word i is blob[offsets[i]:offsets[i+1]-1].
+
+  :param source: the word list, one word per line
+  :type source: str
+
+  :param destination: where the packed file is written
+  :type destination: str
+  """
+  with open(source) as p:
+    words = sorted({word.strip().lower() for word in p.read().split("\n") if word.strip() != ""})
+
+  offsets = array("I", [0])
+  blob = bytearray()
+  for word in words:
+    blob += word.encode("ascii") + b"\n"
+    offsets.append(len(blob))
+  if sys.byteorder != "little":
+    offsets.byteswap()
+
+  size, mtime = source_stamp(source)
+  # written to a temporary name first so running games never map a half written file
+  temporary = destination + ".tmp"
+  with open(temporary, "wb") as p:
+    p.write(HEADER.pack(MAGIC, VERSION, len(words), len(blob), size, mtime))
+    p.write(offsets.tobytes())
+    p.write(blob)
+  os.replace(temporary, destination)
+  return len(words)
+
+
+class PackedDictionary:
+  """
+  This class is a read only dictionary backed by a memory mapped packed file
+
+  Nothing is parsed at start up and no per word objects are kept, so opening is near instant and
+  every process on the host shares the same pages of the file. A packed dictionary that is already
+  in memory, such as a shared memory block, can be read in place by passing it as argument buffer.
+  """
+  def __init__(self, path=PACKED_FILE, buffer=None):
+    """
+    :param path: the packed file to map, unused if argument buffer is given
+    :type path: str
+
+    :param buffer: the contents of a packed file, which are read without being copied
+    :type buffer: memoryview
+    """
+    self.path = path
+    if buffer == None:
+      with open(path, "rb") as p:
+        self.map = mmap.mmap(p.fileno(), 0, access=mmap.ACCESS_READ)
+      self.data = self.map
+    else:
+      self.map = None
+      self.data = buffer
+
+    magic, version, self.count, blob_length, self.source_size, self.source_mtime = HEADER.unpack_from(self.data, 0)
+    if magic != MAGIC or version != VERSION:
+      if self.map != None:
+        self.map.close()
+      raise ValueError("Not a packed dictionary: " + str(path))
+
+    table_start = HEADER.size
+    self.blob_start = table_start + 4*(self.count + 1)
+    self.blob_end = self.blob_start + blob_length
+
+    self.view = memoryview(self.data)[table_start:self.blob_start]
+    if sys.byteorder == "little":
+      self.offsets = self.view.cast("I")
+    else:
+      # big endian hosts have to pay for one copy of the offsets table
+      self.offsets = array("I", self.view.tobytes())
+      self.offsets.byteswap()
+
+    # only built if something asks for them
+    self.words = None
+    self.index = None
+    self.features = None
+    self.hash = None
+
+  def __len__(self):
+    return self.count
+
+  def __getitem__(self, index):
+    return self.word_bytes(index).decode("ascii")
+
+  def __iter__(self):
+    for index in range(self.count):
+      yield self[index]
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    """Unmaps the file, or lets go of the buffer"""
+    if isinstance(self.offsets, memoryview):
+      self.offsets.release()
+    self.view.release()
+    if self.map != None:
+      self.map.close()
+
+  def is_stale(self, source=WORDS_FILE) -> bool:
+    """Returns True if the word list has changed since the file was packed"""
+    try:
+      return source_stamp(source) != (self.source_size, self.source_mtime)
+    except OSError:
+      return False
+
+  def digest(self) -> str:
+    """Returns a hash of the words in order, the same as words.words_digest of the list of them"""
+    if self.hash == None:
+      with memoryview(self.data) as view, view[self.blob_start:self.blob_end] as blob:
+        self.hash = hashlib.blake2b(blob, digest_size=16).hexdigest()
+    return self.hash
+
+  def word_bytes(self, index) -> bytes:
+    """Returns word number argument index as bytes"""
+    return bytes(self.data[self.blob_start + self.offsets[index]:self.blob_start + self.offsets[index+1] - 1])
+
+  def _lower_bound(self, key:bytes, low=0, high=None) -> int:
+    """Returns the index of the first word that is not less than argument key"""
+    if high == None:
+      high = self.count
+    while low < high:
+      middle = (low + high) // 2
+      if self.word_bytes(middle) < key:
+        low = middle + 1
+      else:
+        high = middle
+    return low
+
+  def find(self, key:bytes, start:int, end:int) -> int:
+    """Returns where argument key first occurs between argument start and end, or -1 if it doesn't"""
+    if self.map != None:
+      return self.map.find(key, start, end)
+    # buffers have no find, but regular expressions can search them without copying
+    match = re.compile(re.escape(key)).search(self.data, start, end)
+    return match.start() if match != None else -1
+
+  def get_words(self) -> list:
+    """Returns a list of all words, decoding the whole file the first time it is called"""
+    if self.words == None:
+      self.words = bytes(self.data[self.blob_start:self.blob_end]).decode("ascii").split("\n")[:-1]
+    return self.words
+
+  def key(self, text:str) -> bytes:
+    """Returns argument text as the bytes words are stored as, or None if it has characters no word can have"""
+    text = text.strip().lower()
+    # words are stored joined by newlines, so a newline would match across the end of a word
+    if "\n" in text:
+      return None
+    try:
+      return text.encode("ascii")
+    except UnicodeEncodeError:
+      return None
+
+  def search_word(self, text:str) -> bool:
+    """Returns a bool value depending on if argument text is in the dictionary"""
+    key = self.key(text)
+    if key == None:
+      return False
+    index = self._lower_bound(key)
+    return index < self.count and self.word_bytes(index) == key
+
+  def contains_many(self, texts) -> list:
+    """Returns a list of bool values, one for each item in argument texts, depending on if it is in the dictionary"""
+    return [self.search_word(text) for text in texts]
+
+  def iter_prefix(self, text:str):
+    """Yields every word that starts with argument text, in sorted order"""
+    key = self.key(text)
+    if key == None:
+      return
+    index = self._lower_bound(key)
+    while index < self.count:
+      word = self.word_bytes(index)
+      if not word.startswith(key):
+        break
+      yield word.decode("ascii")
+      index += 1
+
+  def count_prefix(self, text:str) -> int:
+    """Returns the number of words that start with argument text"""
+    key = self.key(text)
+    if key == None:
+      return 0
+    if key == b"":
+      return self.count
+    # every word starting with key sorts before key with its last letter incremented
+    upper = key[:-1] + bytes([key[-1] + 1])
+    return self._lower_bound(upper) - self._lower_bound(key)
+
+  def get_features(self):
+    """Returns the NumPy feature table of the dictionary, loading it from disk (or building and saving it) the first time, which needs numpy"""
+    if self.features == None:
+      from features import FeatureTable # numpy is only needed by the game modes that use the table
+      self.features = FeatureTable.load_or_build(self)
+    return self.features
+
+  def prefix_cursor(self) -> PrefixCursor:
+    """Returns a new PrefixCursor over the dictionary, which reads the mapped words in place"""
+    return PrefixCursor(self)
+
+  def get_index(self) -> SubstringIndex:
+    """Returns the substring index of the dictionary, loading it from disk (or building and saving it) the first time"""
+    if self.index == None:
+      self.index = SubstringIndex.load_or_build(self)
+    return self.index
+
+  def iter_solution_indexes(self, text:str):
+    """Yields the index of every word that contains argument text by scanning the mapped blob"""
+    key = self.key(text)
+    if key == None:
+      return
+    if key == b"":
+      yield from range(self.count)
+      return
+    position = self.find(key, self.blob_start, self.blob_end)
+    while position != -1:
+      index = bisect.bisect_right(self.offsets, position - self.blob_start) - 1
+      yield index
+      # carries on from the start of the next word so each word is only yielded once
+      position = self.find(key, self.blob_start + self.offsets[index+1], self.blob_end)
+
+  def iter_solutions(self, text:str):
+    """Yields every word that contains argument text"""
+    for index in self.iter_solution_indexes(text):
+      yield self[index]
+
+  def count_solutions(self, text:str) -> int:
+    """Returns the number of words that contain argument text"""
+    return sum(1 for _ in self.iter_solution_indexes(text))
+
+
+def load_dictionary(path=PACKED_FILE, source=WORDS_FILE):
+  """Returns the packed dictionary if an up to date one exists, otherwise falls back to parsing the word list"""
+  try:
+    packed = PackedDictionary(path)
+  except (OSError, ValueError, struct.error):
+    return dictionary()
+  if packed.is_stale(source):
+    packed.close()
+    return dictionary()
+  return packed
+
+
+if __name__ == "__main__":
+  # python packed.py [source] [destination]
+  source = sys.argv[1] if len(sys.argv) > 1 else WORDS_FILE
+  destination = sys.argv[2] if len(sys.argv) > 2 else PACKED_FILE
+  count = pack(source, destination)
+  print(f"Packed {count} words from {source} into {destination} ({os.path.getsize(destination)} bytes)")
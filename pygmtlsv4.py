@@ -1,13 +1,181 @@
+import time
 import pygame
+import json
+import threading
+from collections import OrderedDict, deque
+
+
+class TextCache:
+  """
+  This class keeps rendered text surfaces so the same text isn't rasterised again every frame
+
+  Surfaces are keyed by (font, text, colour, antialias, background) and the least recently used ones
+  are evicted once either maxItems surfaces or maxBytes of pixels are held. Surfaces returned are
+  shared between callers so must not be drawn on.
+  """
+  def __init__(self, maxItems = 512, maxBytes = 16*1024*1024):
+    self.maxItems = maxItems
+    self.maxBytes = maxBytes
+    self.surfaces = OrderedDict()
+    self.bytes = 0
+    
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    
+  def render(self, font, text, antialias, colour, background = None):
+    """Works the same as font.render, but returns a cached surface if this text has been rendered before"""
+    key = (font, text, tuple(colour), bool(antialias), None if background == None else tuple(background))
+    surface = self.surfaces.get(key)
+    if surface != None:
+      self.surfaces.move_to_end(key)
+      self.hits += 1
+      return surface
+    
+    self.misses += 1
+    surface = font.render(text, antialias, colour, background)
+    self.surfaces[key] = surface
+    self.bytes += surface.get_width()*surface.get_height()*surface.get_bytesize()
+    
+    # evicts the least recently used surfaces, always keeping the one just rendered
+    while len(self.surfaces) > 1 and (len(self.surfaces) > self.maxItems or self.bytes > self.maxBytes):
+      _, old = self.surfaces.popitem(last=False)
+      self.bytes -= old.get_width()*old.get_height()*old.get_bytesize()
+      self.evictions += 1
+    return surface
+  
+  def clear(self):
+    self.surfaces.clear()
+    self.bytes = 0
+    
+  def stats(self) -> dict:
+    """Returns the hit and miss counters and how much the cache is holding"""
+    total = self.hits + self.misses
+    return {
+      "hits" : self.hits,
+      "misses" : self.misses,
+      "evictions" : self.evictions,
+      "hitRate" : self.hits/total if total != 0 else 0,
+      "items" : len(self.surfaces),
+      "bytes" : self.bytes,
+    }
+
+
+# shared by everything that draws text so identical labels are only rendered once
+textCache = TextCache()
+
+
+class Assets:
+  """
+  This class keeps every image converted to the display's pixel format, with scaled copies of them
+
+  Each image is converted once when it is added, so blitting it never has to convert pixels on the
+  way. Scaled copies are made from the converted image the first time a size is asked for and keyed
+  by (name, size), and the least recently used ones are evicted once either maxItems copies or
+  maxBytes of pixels are held. Surfaces returned are shared between callers so must not be drawn on.
+  """
+  def __init__(self, maxItems = 64, maxBytes = 64*1024*1024):
+    self.maxItems = maxItems
+    self.maxBytes = maxBytes
+    self.sources = {}
+    self.variants = OrderedDict()
+    self.bytes = 0
+    
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    
+  def add(self, name, surface):
+    """Adds argument surface under argument name, converted to the display's format, replacing any image of that name"""
+    if surface.get_flags() & pygame.SRCALPHA:
+      surface = surface.convert_alpha()
+    else:
+      surface = surface.convert() # keeps any colour key, which blits much faster than per pixel alpha
+    self.sources[name] = surface
+    for key in [key for key in self.variants if key[0] == name]:
+      self.discard(key)
+    return surface
+      
+  def load(self, name, path):
+    """Loads the image at argument path under argument name"""
+    return self.add(name, pygame.image.load(path))
+    
+  def get(self, name, size = None):
+    """Returns the image argument name scaled to argument size, or at its own size if it is None"""
+    source = self.sources[name]
+    if size == None:
+      return source
+    size = (round(size[0]), round(size[1]))
+    if size == source.get_size():
+      return source
+    
+    key = (name, size)
+    surface = self.variants.get(key)
+    if surface != None:
+      self.variants.move_to_end(key)
+      self.hits += 1
+      return surface
+    
+    self.misses += 1
+    surface = pygame.transform.scale(source, size) # keeps the source's converted format
+    self.variants[key] = surface
+    self.bytes += surface.get_width()*surface.get_height()*surface.get_bytesize()
+    
+    # evicts the least recently used copies, always keeping the one just made
+    while len(self.variants) > 1 and (len(self.variants) > self.maxItems or self.bytes > self.maxBytes):
+      self.discard(next(iter(self.variants)))
+      self.evictions += 1
+    return surface
+  
+  def discard(self, key):
+    old = self.variants.pop(key)
+    self.bytes -= old.get_width()*old.get_height()*old.get_bytesize()
+    
+  def clear(self):
+    """Drops every scaled copy, the converted images are kept"""
+    self.variants.clear()
+    self.bytes = 0
+    
+  def stats(self) -> dict:
+    """Returns the hit and miss counters and how much the cache is holding"""
+    total = self.hits + self.misses
+    return {
+      "hits" : self.hits,
+      "misses" : self.misses,
+      "evictions" : self.evictions,
+      "hitRate" : self.hits/total if total != 0 else 0,
+      "images" : len(self.sources),
+      "items" : len(self.variants),
+      "bytes" : self.bytes,
+    }
+
 
 class Button:
   """
   This class holds every button instance created by the create function
+
+  Buttons are kept in a registry keyed by the id returned from create, so showing, hiding and
+  changing a button doesn't search through every button. Each button is composed onto its own
+  surface once and only recomposed when one of its attributes changes, and clicks are only tested
+  against the buttons in the grid cell under the mouse.
   """
+  CELL = 64
+  
   def __init__(self):
-    self.buttons = []
-    self.visible = []
-    self.hidden = []
+    self.buttons = {}
+    self.visible = {}
+    self.hidden = {}
+    
+    # tuple(rect) -> ids of the buttons with that rect, so buttons can still be found by their rect
+    self.rects = {}
+    
+    # (column, row) -> ids of the visible buttons overlapping that cell
+    self.grid = {}
+    
+    self.nextId = 0
+    
+    # goes up every time anything about the buttons changes, so drawers know when to redraw
+    self.version = 0
     
     self.attrs = {
       "rect" : 0,
@@ -20,9 +188,9 @@ class Button:
       "textColour" : 7,
     }
     
-  def create(self, rect, colour, event, outlineWidth = 0, outlineColour = (0, 0, 0), visible = True, text = "", font = None, textColour = (0, 0, 0)):
+  def create(self, rect, colour, event, outlineWidth = 0, outlineColour = (0, 0, 0), visible = True, text = "", font = None, textColour = (0, 0, 0)) -> int:
     """
-    This function creates a button
+    This function creates a button and returns its id
     
     :param rect: the rectangle of the button
     :type rect: pygame.Rect
@@ -39,112 +207,312 @@ class Button:
     :param outlineColour: the colour of the border
     :type outlineColour: (R, G, B)
     """
-    temp = [rect, colour, event, outlineWidth, outlineColour, text, font, textColour]
+    buttonId = self.nextId
+    self.nextId += 1
+    
+    button = {
+      "rect" : pygame.Rect(rect),
+      "colour" : colour,
+      "event" : event,
+      "outlineWidth" : outlineWidth,
+      "outlineColour" : outlineColour,
+      "text" : text,
+      "font" : font,
+      "textColour" : textColour,
+    }
+    self.compose(button)
+    self.buttons[buttonId] = button
+    self.rects.setdefault(tuple(button["rect"]), set()).add(buttonId)
+    
     if visible == True:
-      self.visible.append(temp)
+      self.show(buttonId)
     else:
-      self.hidden.append(temp)
-    self.buttons.append(temp)
+      self.hidden[buttonId] = button
+    self.version += 1
+    return buttonId
+  
+  def compose(self, button):
+    """Draws the button's fill, outline and label onto its own surface"""
+    rect = button["rect"]
+    area = rect.copy()
+    
+    txt = None
+    if button["font"] != None:
+      txt = textCache.render(button["font"], button["text"], 1, button["textColour"])
+      textRect = pygame.Rect(int(rect.centerx - txt.get_width()/2), int(rect.centery - txt.get_height()/2), txt.get_width(), txt.get_height())
+      # labels wider than the button still overhang it like they always have
+      area.union_ip(textRect)
+      
+    surface = pygame.Surface(area.size, pygame.SRCALPHA)
+    local = rect.move(-area.x, -area.y)
+    pygame.draw.rect(surface, button["colour"], local)
+    if button["outlineWidth"] != 0:
+      pygame.draw.rect(surface, button["outlineColour"], local, button["outlineWidth"])
+    if txt != None:
+      surface.blit(txt, (textRect.x - area.x, textRect.y - area.y))
+      
+    button["surface"] = surface
+    button["area"] = area
+    
+  def find(self, button) -> list:
+    """Returns the ids matching argument button, which is either an id or the rect of the buttons"""
+    if isinstance(button, int):
+      return [button] if button in self.buttons else []
+    return list(self.rects.get(tuple(pygame.Rect(button)), ()))
+  
+  def cells(self, rect):
+    """Yields every grid cell argument rect overlaps"""
+    for column in range(rect.left//self.CELL, (rect.right-1)//self.CELL + 1):
+      for row in range(rect.top//self.CELL, (rect.bottom-1)//self.CELL + 1):
+        yield (column, row)
+        
+  def show(self, buttonId):
+    button = self.buttons[buttonId]
+    self.hidden.pop(buttonId, None)
+    self.visible[buttonId] = button
+    for cell in self.cells(button["rect"]):
+      self.grid.setdefault(cell, set()).add(buttonId)
+    self.version += 1
+      
+  def hide(self, buttonId):
+    button = self.buttons[buttonId]
+    self.visible.pop(buttonId, None)
+    self.hidden[buttonId] = button
+    for cell in self.cells(button["rect"]):
+      self.grid[cell].discard(buttonId)
+    self.version += 1
 
   def draw(self, window):
-    for button in self.visible:
-      pygame.draw.rect(window, button[self.attrs["colour"]], button[self.attrs["rect"]])
-      if button[self.attrs["outlineWidth"]] != 0:
-        pygame.draw.rect(window, button[self.attrs["outlineColour"]], button[self.attrs["rect"]], button[self.attrs["outlineWidth"]])
-      if button[self.attrs["font"]] != None:
-        txt = button[self.attrs["font"]].render(button[self.attrs["text"]], 1, button[self.attrs["textColour"]])
-        window.blit(txt, (button[self.attrs["rect"]].centerx - txt.get_width()/2, button[self.attrs["rect"]].centery - txt.get_height()/2))
+    for button in self.visible.values():
+      window.blit(button["surface"], button["area"])
+      
+  def get_visible_rects(self) -> list:
+    """Returns the area covered by each visible button"""
+    return [button["area"] for button in self.visible.values()]
       
   def check(self, mouse):
-    for button in self.visible:
-      if button[self.attrs["rect"]].collidepoint(mouse):
-        pygame.event.post(pygame.event.Event(button[self.attrs["event"]]))
-        
-  def toggleVis(self, rect):
-    edited = False
-    for button in self.visible:
-      if button[self.attrs["rect"]] == rect:
-        self.visible.remove(button)
-        self.hidden.append(button)
-        edited = True
+    cell = (int(mouse[0])//self.CELL, int(mouse[1])//self.CELL)
+    for buttonId in sorted(self.grid.get(cell, ())):
+      if self.buttons[buttonId]["rect"].collidepoint(mouse):
+        pygame.event.post(pygame.event.Event(self.buttons[buttonId]["event"]))
         
-    if edited == False:
-      for button in self.hidden:
-        if button[self.attrs["rect"]] == rect:
-          self.hidden.remove(button)
-          self.visible.append(button)
+  def toggleVis(self, button):
+    """Shows or hides argument button, which is either an id or the rect of the buttons"""
+    for buttonId in self.find(button):
+      if buttonId in self.visible:
+        self.hide(buttonId)
+      else:
+        self.show(buttonId)
       
-  def changeAttr(self, rect, attr, newVal):
-    if attr in self.attrs.keys():
-      for button in self.buttons:
-        if button[self.attrs["rect"]] == rect:
-          button[self.attrs[attr]] = newVal
-    else:
+  def changeAttr(self, button, attr, newVal):
+    """Changes one attribute of argument button, which is either an id or the rect of the buttons"""
+    if attr not in self.attrs.keys():
       raise ValueError("Attribute does not exist: " + str(attr))
     
-  def remove(self, rect):
-    for button in self.buttons:
-      if button[self.attrs["rect"]] == rect:
-        self.buttons.remove(button)
-        try:
-          self.hidden.remove(button)
-        except:
-          self.visible.remove(button)
+    for buttonId in self.find(button):
+      item = self.buttons[buttonId]
+      visible = buttonId in self.visible
+      if attr == "rect":
+        # the button has to be moved in the rect lookup and the grid as well
+        if visible:
+          self.hide(buttonId)
+        self.rects[tuple(item["rect"])].discard(buttonId)
+        newVal = pygame.Rect(newVal)
+        self.rects.setdefault(tuple(newVal), set()).add(buttonId)
+      item[attr] = newVal
+      self.compose(item)
+      if attr == "rect" and visible:
+        self.show(buttonId)
+    self.version += 1
+    
+  def remove(self, button):
+    """Deletes argument button, which is either an id or the rect of the buttons"""
+    for buttonId in self.find(button):
+      if buttonId in self.visible:
+        self.hide(buttonId)
+      self.hidden.pop(buttonId)
+      self.rects[tuple(self.buttons[buttonId]["rect"])].discard(buttonId)
+      del self.buttons[buttonId]
+    self.version += 1
 
 
 class Scroll:
+  """
+  This class is a scrollable area that items are added to once and kept until they are removed
+
+  Items are stored by name along with the bands of rows they cover, so drawing only looks at the
+  items in the bands the view overlaps. The view is drawn onto a surface that is kept until an item
+  in view changes or the view scrolls, so a list that isn't moving costs a single blit a frame.
+  """
+  BAND = 64
+  
   def __init__(self, x, y, width, height, maxHeight, scrollbarWidth, colour):
     self.buffer = 2
     
+    # how far down the content the top of the view is
     self.currentY = 0
     
     self.x = x
     self.y = y
     self.width = width
     self.height = height
-    self.total = maxHeight
+    self.minimum = maxHeight
+    self.total = max(maxHeight, height)
+    self.scrollbarWidth = scrollbarWidth
     self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
     self.surface = pygame.Surface((self.width, self.height))
     self.colour = colour
     
-    self.surface.fill(self.colour)
-    
     self.scrollClickY = 0
+    self.down = False
+    
+    # name -> item, in the order they are drawn
+    self.items = {}
+    
+    # band -> names of the items overlapping that band of rows
+    self.bands = {}
+    
+    self.nextId = 0
+    self.nextOrder = 0
+    
+    # the surface is only redrawn when this is set, and version goes up every time it is
+    self.stale = True
+    self.version = 0
     
-    self.scrollBar = [self.width - scrollbarWidth - self.buffer, self.height*(self.currentY/self.total) + self.buffer, scrollbarWidth, (self.height/self.total)*self.height - self.buffer*2]
+    self.update_scroll_bar()
+    
+  def update_scroll_bar(self):
+    """Moves and resizes the scroll bar to match the view"""
+    track = self.height - self.buffer*2
+    barHeight = max(self.buffer*2, track*self.height/self.total)
+    travel = self.total - self.height
+    top = self.buffer + (track - barHeight)*(self.currentY/travel if travel > 0 else 0)
+    self.scrollBar = [self.width - self.scrollbarWidth - self.buffer, top, self.scrollbarWidth, barHeight]
     self.scrollBarRect = pygame.Rect(*self.scrollBar)
-    self.down = False
     
-    self.items = []
+  def get_view(self) -> pygame.Rect:
+    """Returns the part of the content that is in view"""
+    return pygame.Rect(0, self.currentY, self.width, self.height)
     
-  def draw(self, window):
-    window.blit(self.surface, (self.x, self.y))
-    pygame.draw.rect(self.surface, self.colour, pygame.Rect(0, 0, self.width, self.height))
-    for item in self.items:
-      if item["shape"] == "rect":
-        pygame.draw.rect(self.surface, item["colour"], pygame.Rect(item["x"], item["y"]-self.currentY, item["width"], item["height"]))
-        if item["borderWidth"] != None and item["borderColour"] != None:
-          pygame.draw.rect(self.surface, item["borderColour"], pygame.Rect(item["x"], item["y"]-self.currentY, item["width"], item["height"]), item["borderWidth"])
-          
-      elif item["shape"] == "line":
-        pygame.draw.aaline(self.surface, item["colour"], (item["start"][0], item["start"][1]-self.currentY), (item["end"][0], item["end"][1]-self.currentY), item["width"])
-        
-      elif item["shape"] == "circle":
-        pygame.draw.circle(self.surface, item["colour"], (item["centerx"], item["centery"] - self.currentY), item["radius"])
-        if item["borderWidth"] != None and item["borderColour"] != None:
-          pygame.draw.circle(self.surface, item["borderColour"], (item["centerx"], item["centery"] - self.currentY), item["radius"], item["borderWidth"])
-          
-      elif item["shape"] == "surface":
-        pass
+  def scroll_to(self, y):
+    """Moves the view so its top is argument y pixels down the content"""
+    y = max(0, min(y, self.total - self.height))
+    if y != self.currentY:
+      self.currentY = y
+      self.update_scroll_bar()
+      self.stale = True
+      
+  def bands_of(self, rect):
+    return range(rect.top//self.BAND, (rect.bottom-1)//self.BAND + 1)
+  
+  def touch(self, rect):
+    """Marks the surface for redrawing if argument rect is in view"""
+    if rect.colliderect(self.get_view()):
+      self.stale = True
+      
+  def resize(self, total):
+    """Changes the height of the content, keeping the view inside it"""
+    if total != self.total:
+      self.total = total
+      self.currentY = max(0, min(self.currentY, self.total - self.height))
+      self.update_scroll_bar()
+      self.stale = True
+      
+  def add(self, item, bounds, name = None):
+    """
+    This function stores argument item, replacing any item with the same name, and returns its name
+    
+    :param bounds: the area of the content the item covers
+    :type bounds: pygame.Rect
+    """
+    if name == None:
+      name = self.nextId
+      self.nextId += 1
+    if name in self.items:
+      self.remove(name)
+      
+    item["name"] = name
+    item["bounds"] = pygame.Rect(bounds)
+    item["order"] = self.nextOrder
+    self.nextOrder += 1
+    self.items[name] = item
+    for band in self.bands_of(item["bounds"]):
+      self.bands.setdefault(band, set()).add(name)
+      
+    if item["bounds"].bottom > self.total:
+      self.resize(item["bounds"].bottom)
+    self.touch(item["bounds"])
+    return name
+  
+  def remove(self, name):
+    """Removes the item called argument name"""
+    item = self.items.pop(name)
+    for band in self.bands_of(item["bounds"]):
+      self.bands[band].discard(name)
+    self.touch(item["bounds"])
+    if item["bounds"].bottom >= self.total:
+      self.resize(max([self.minimum, self.height] + [other["bounds"].bottom for other in self.items.values()]))
+      
+  def clear(self):
+    """Removes every item and scrolls back to the top"""
+    self.items = {}
+    self.bands = {}
+    self.currentY = 0
+    self.total = max(self.minimum, self.height)
+    self.update_scroll_bar()
+    self.stale = True
     
+  def in_view(self) -> list:
+    """Returns the items that overlap the view, in the order they were added"""
+    view = self.get_view()
+    names = set()
+    for band in self.bands_of(view):
+      names.update(self.bands.get(band, ()))
+    found = [self.items[name] for name in names if self.items[name]["bounds"].colliderect(view)]
+    found.sort(key=lambda item: item["order"])
+    return found
+  
+  def draw_item(self, item):
+    offset = self.currentY
+    if item["shape"] == "rect":
+      pygame.draw.rect(self.surface, item["colour"], pygame.Rect(item["x"], item["y"]-offset, item["width"], item["height"]))
+      if item["borderWidth"] != None and item["borderColour"] != None:
+        pygame.draw.rect(self.surface, item["borderColour"], pygame.Rect(item["x"], item["y"]-offset, item["width"], item["height"]), item["borderWidth"])
+        
+    elif item["shape"] == "line":
+      start = (item["start"][0], item["start"][1]-offset)
+      end = (item["end"][0], item["end"][1]-offset)
+      if item["width"] > 1:
+        pygame.draw.line(self.surface, item["colour"], start, end, item["width"])
+      else:
+        pygame.draw.aaline(self.surface, item["colour"], start, end)
+      
+    elif item["shape"] == "circle":
+      pygame.draw.circle(self.surface, item["colour"], (item["centerx"], item["centery"] - offset), item["radius"])
+      if item["borderWidth"] != None and item["borderColour"] != None:
+        pygame.draw.circle(self.surface, item["borderColour"], (item["centerx"], item["centery"] - offset), item["radius"], item["borderWidth"])
+        
+    elif item["shape"] == "surface":
+      self.surface.blit(item["surface"], (item["bounds"].x, item["bounds"].y - offset))
+      
+  def refresh(self):
+    """Redraws the surface if anything in view has changed since it was last drawn"""
+    if not self.stale:
+      return
+    self.surface.fill(self.colour)
+    for item in self.in_view():
+      self.draw_item(item)
     pygame.draw.rect(self.surface, (211, 211, 211), self.scrollBarRect)
+    self.stale = False
+    self.version += 1
     
-    self.items = []
+  def draw(self, window):
+    self.refresh()
+    window.blit(self.surface, (self.x, self.y))
 
   def draw_rect(self, rect_name, colour, x, y, width, height, borderWidth=None, borderColour=None):
     dictionary = {
       "shape" : "rect",
-      "name" : rect_name,
       "colour" : colour,
       "x" : x,
       "y" : y,
@@ -153,23 +521,22 @@ class Scroll:
       "borderWidth" : borderWidth,
       "borderColour" : borderColour
     }
-    self.items.append(dictionary)
+    return self.add(dictionary, pygame.Rect(x, y, width, height), rect_name)
     
   def draw_line(self, line_name, colour, start, end, width):
     dictionary = {
       "shape" : "line",
-      "name" : line_name,
       "colour" : colour,
       "start" : start,
       "end" : end,
       "width" : width
     }
-    self.items.append(dictionary)
+    bounds = pygame.Rect(min(start[0], end[0]), min(start[1], end[1]), abs(end[0] - start[0]) + 1, abs(end[1] - start[1]) + 1)
+    return self.add(dictionary, bounds.inflate(width*2, width*2), line_name)
     
   def draw_circle(self, line_name, colour, centerx, centery, radius, borderWidth = None, borderColour = None):
     dictionary = {
       "shape" : "circle",
-      "name" : line_name,
       "colour" : colour,
       "centerx" : centerx,
       "centery" : centery,
@@ -177,17 +544,14 @@ class Scroll:
       "borderWidth" : borderWidth,
       "borderColour" : borderColour
     }
-    self.items.append(dictionary)
+    return self.add(dictionary, pygame.Rect(centerx - radius, centery - radius, radius*2 + 1, radius*2 + 1), line_name)
 
-  def blit(self, surface, destination):
+  def blit(self, surface, destination, name = None):
     dictionary = {
       "shape" : "surface",
-      
+      "surface" : surface,
     }
-    
-    self.items.append(dictionary)
-    
-  
+    return self.add(dictionary, surface.get_rect(topleft=destination), name)
   
   def checkMouseDown(self, mouse):
     rect = pygame.Rect(self.scrollBarRect.left + self.x, self.scrollBarRect.top + self.y, self.scrollBarRect.width, self.scrollBarRect.height)
@@ -198,30 +562,18 @@ class Scroll:
       
   def checkMouseMotion(self, mouse):
     if pygame.mouse.get_pressed()[0] and self.down == True:
-      self.currentY = self.origin + mouse[1] - self.scrollClickY
-      
-      if self.currentY < self.buffer:
-        self.currentY = self.buffer
-        
-      elif self.currentY > self.height - self.scrollBarRect.height - self.buffer:
-        self.currentY = self.height - self.scrollBarRect.height - self.buffer
-      self.scrollBar[1] = self.currentY
-      self.scrollBarRect = pygame.Rect(*self.scrollBar)
+      # turns where the bar has been dragged to into how far down the content that is
+      track = self.height - self.buffer*2 - self.scrollBarRect.height
+      top = self.origin + mouse[1] - self.scrollClickY - self.buffer
+      self.scroll_to(round(top/track*(self.total - self.height)) if track > 0 else 0)
         
   def checkMouseUp(self, mouse):
     self.scrollClickY = 0
     self.down = False
 
-  def checkScroll(self, event, sensitivity=5):
-    self.currentY -= sensitivity*event.y
-    if self.currentY < self.buffer:
-      self.currentY = self.buffer
-
-    elif self.currentY > self.height - self.scrollBarRect.height - self.buffer:
-      self.currentY = self.height - self.scrollBarRect.height - self.buffer
-      
-    self.scrollBar[1] = self.currentY
-    self.scrollBarRect = pygame.Rect(*self.scrollBar)
+  def checkScroll(self, event, sensitivity=20):
+    """Scrolls by argument sensitivity pixels of content for each notch of the mouse wheel"""
+    self.scroll_to(self.currentY - sensitivity*event.y)
     
 class Menu:
   class header:
@@ -258,7 +610,7 @@ class Menu:
       pygame.draw.line(window, self.outlinecolour, (0, self.y + self.height), (self.width, self.y + self.height))
       totalLen = self.x + 5
       for heading in self.headings:
-        text = self.font.render(heading.upper(), 1, self.textcolour)
+        text = textCache.render(self.font, heading.upper(), 1, self.textcolour)
         if self.headings.index(heading) == self.current:
           pygame.draw.rect(window, self.outlinecolour, pygame.Rect(totalLen, self.y, text.get_width()+self.padding, self.height-1), 1)
           pygame.draw.rect(window, self.fgcolour, pygame.Rect(totalLen + 1, self.y + 1, text.get_width()+self.padding - 2, self.height-2))
@@ -307,26 +659,55 @@ class Animation_group:
       anims.stop()
 
 class Animation:
-  def __init__(self, x, y, frame_type = "image"):
+  """
+  This class plays a sequence of frames, each shown for its own duration in milliseconds
+
+  Frames move on by how much time has passed, not by how many times the animation has been drawn,
+  so animations play at the same speed whatever the frame rate. The mode decides what happens at
+  the last frame: "loop" goes back to the start, "once" stops (and rewinds) and "pingpong" plays
+  the frames backwards again.
+  """
+  DEFAULT_DURATION = 1000/60 # ms, one frame at 60 FPS
+  MODES = ("loop", "once", "pingpong")
+  
+  def __init__(self, x, y, frame_type = "image", mode = "loop", clock = None):
+    if mode not in self.MODES:
+      raise ValueError("Mode does not exist: " + str(mode))
     self.initial_x = x
     self.initial_y = y
     self.current_x = x
     self.current_y = y
     self.frames = []
     self.offsets = []
+    self.durations = []
     self.type = frame_type
+    self.mode = mode
     self.current = 0
+    self.direction = 1
     self.state = "stop"
     
+    # returns the time in ms, pygame's clock unless told otherwise
+    self.clock = clock if clock != None else pygame.time.get_ticks
+    self.last_time = 0
+    self.elapsed = 0
+    
   def start(self):
     
     # allows the play function to run
     self.state = "playing"
+    self.last_time = self.clock()
+    self.elapsed = 0
     
   def stop(self):
     # prevents the play function from running
     self.state = "stop"
     
+  def set_mode(self, mode):
+    if mode not in self.MODES:
+      raise ValueError("Mode does not exist: " + str(mode))
+    self.mode = mode
+    self.direction = 1
+    
   def set_coords(self, initial_x, initial_y, current_x, current_y):
     # allows the user to change the coords
     self.initial_x = initial_x
@@ -344,8 +725,9 @@ class Animation:
       print(self.frames)
     return self.frames
   
-  def set_frames(self, frames = []):
+  def set_frames(self, frames = [], durations = None):
     self.frames = frames
+    self.set_durations(durations if durations != None else [self.DEFAULT_DURATION for _ in frames])
     
   def get_offsets(self, display = True):
     if display == True:
@@ -355,42 +737,29 @@ class Animation:
   def set_offsets(self, offsets = []):
     self.offsets = offsets
     
-  def duplicate_frame(self, frame_index, duplication_factor = 2):
-    
-    # gets the frame and offset
-    frame = self.frames[frame_index]
-    offset = self.offsets[frame_index]
-    
-    # gets the current range of frames
-    frames = self.frames
-    offsets = self.offsets
+  def get_durations(self, display = True):
+    if display == True:
+      print(self.durations)
+    return self.durations
+  
+  def set_durations(self, durations = []):
+    """Sets how long each frame is shown for in ms, either one duration for every frame or a list with one per frame"""
+    if isinstance(durations, (int, float)):
+      durations = [durations for _ in self.frames]
+    self.durations = list(durations)
     
-    # point of duplication
-    for _ in range(0, duplication_factor):
-      frames.insert(frame_index, frame)
-      offsets.insert(frame_index, offset)
+  def duplicate_frame(self, frame_index, duplication_factor = 2):
     
-    # uploads the changes to the 
-    self.set_frames(frames)
-    self.set_offsets(offsets)
+    # the frame is shown for as long as duplication_factor extra copies of it would be, without copying it
+    self.durations[frame_index] *= duplication_factor + 1
     
   def duplicate_range(self, index_list, duplication_factor = 2):
-    
-    # reverses the index list to prevent duplicating the incorrect 
-    index_list.sort(reverse = True)
     for index in index_list:
       self.duplicate_frame(index, duplication_factor)
     
   def duplicate_all_frames(self, duplication_factor = 2):
     
     self.duplicate_range([x for x in range(0, len(self.frames))], duplication_factor)
-    
-    # frames = []
-    # offsets = []
-    # [frames.extend([frame for _ in range(duplication_factor)]) for frame in self.frames]
-    # [offsets.extend([offset for _ in range(duplication_factor)]) for offset in self.offsets]
-    # self.set_frames(frames)
-    # self.set_offsets(offsets)
 
   def get_current_frame(self, display = True):
     if display == True:
@@ -399,6 +768,7 @@ class Animation:
   
   def set_current_frame(self, frame):
     self.current = frame
+    self.elapsed = 0
     
   def increment_frame(self):
     self.current += 1
@@ -410,33 +780,471 @@ class Animation:
     if self.current < 0:
       self.current = len(self.frames) - 1
     
-  def add_frame(self, image, offset = [0, 0]):
+  def add_frame(self, image, offset = [0, 0], duration = DEFAULT_DURATION):
     self.frames.append(image)
     self.offsets.append(offset)
+    self.durations.append(duration)
     
   def remove_frame(self, index):
     self.frames.pop(index)
     self.offsets.pop(index)
+    self.durations.pop(index)
     
-  def play_next_frame(self, window, auto_increment_frame = True, auto_stop = False):
+  def get_rect(self):
+    """Returns the area the current frame will be drawn over, or an empty rect if nothing is being drawn"""
+    if self.state != "playing" or self.type != "image":
+      return pygame.Rect(0, 0, 0, 0)
+    frame = self.frames[self.current]
+    return pygame.Rect(self.current_x + self.offsets[self.current][0], self.current_y + self.offsets[self.current][1], frame.get_width(), frame.get_height())
+    
+  def draw(self, window):
+    """Draws the current frame without moving the animation on"""
     if self.state == "playing":
       if self.type == "image":
+        window.blit(self.frames[self.current], self.get_rect())
         
-        # adjusts image position
-        self.current_x += self.offsets[self.current][0]
-        self.current_y += self.offsets[self.current][1]
-        
-        # draws image on screen
-        window.blit(self.frames[self.current], (self.current_x, self.current_y))
+  def step(self, auto_stop = False):
+    """Moves on by exactly one frame according to the mode"""
+    
+    # adjusts image position
+    self.current_x += self.offsets[self.current][0]
+    self.current_y += self.offsets[self.current][1]
+    
+    last = len(self.frames) - 1
+    if self.mode == "pingpong" and last > 0:
+      if not 0 <= self.current + self.direction <= last:
+        self.direction = -self.direction
+      self.current += self.direction
+    elif self.current == last and (self.mode == "once" or auto_stop == True):
+      # one shot animations stop and rewind once the last frame has been shown
+      self.stop()
+      self.current = 0
+    else:
+      self.increment_frame()
         
-        if auto_stop == True:
-          if self.current == len(self.frames) - 1:
-            self.stop()
+  def advance(self, auto_increment_frame = True, auto_stop = False):
+    """Moves the animation on by however many frames fit into the time passed since it was last moved on"""
+    now = self.clock()
+    passed = now - self.last_time
+    self.last_time = now
+    
+    if self.state != "playing" or self.type != "image" or auto_increment_frame != True or self.frames == []:
+      return
+    
+    self.elapsed += passed
+    
+    # skips whole cycles at once after a long stall instead of stepping through every one
+    if self.mode != "once" and auto_stop != True:
+      cycle = sum(self.durations) if self.mode == "loop" else 2*sum(self.durations) - self.durations[0] - self.durations[-1]
+      if cycle > 0 and self.elapsed >= cycle:
+        self.elapsed %= cycle
         
-        #moves frame forwards by 1
-        if auto_increment_frame == True:
-          self.increment_frame()
-      #if self.type == ""
+    # no more than a couple of passes through the frames, in case every duration is 0
+    steps = 0
+    while self.state == "playing" and self.elapsed >= self.durations[self.current] and steps <= 2*len(self.frames):
+      self.elapsed -= self.durations[self.current]
+      self.step(auto_stop)
+      steps += 1
+    
+  def play_next_frame(self, window, auto_increment_frame = True, auto_stop = False):
+    self.draw(window)
+    self.advance(auto_increment_frame, auto_stop)
 
   def play(self, window, auto_increment_frame, auto_stop = False):
     self.play_next_frame(window, auto_increment_frame, auto_stop)
+
+
+class DirtyRects:
+  """
+  This class keeps track of which parts of the window have changed since the last frame
+
+  Every frame each element is tracked with a key describing what it looks like and the rect it
+  covers. Only elements whose key or rect changed mark their old and new areas as dirty, and only
+  those areas are redrawn and pushed to the display.
+  """
+  def __init__(self, size):
+    self.screen = pygame.Rect(0, 0, *size)
+    self.keys = {}
+    self.rects = {}
+    self.dirty = []
+    self.full = True
+    
+  def invalidate(self):
+    """Makes the whole window redraw on the next frame, e.g. after it has been uncovered"""
+    self.full = True
+    
+  def track(self, name, key, rect):
+    """
+    This function records what an element looks like this frame
+    
+    :param name: the name of the element
+    :type name: str
+    
+    :param key: anything that changes when the element's appearance changes
+    :type key: any comparable value
+    
+    :param rect: the area the element covers this frame
+    :type rect: pygame.Rect
+    """
+    rect = pygame.Rect(rect)
+    if name not in self.keys or self.keys[name] != key or self.rects[name] != rect:
+      if name in self.rects:
+        self.dirty.append(self.rects[name])
+      self.dirty.append(rect)
+      self.keys[name] = key
+      self.rects[name] = rect
+      
+  def regions(self) -> list:
+    """Returns the areas that need redrawing this frame, with overlapping areas merged"""
+    if self.full:
+      return [self.screen.copy()]
+    
+    merged = []
+    for rect in self.dirty:
+      rect = rect.clip(self.screen)
+      if rect.width == 0 or rect.height == 0:
+        continue
+      index = 0
+      while index < len(merged):
+        if merged[index].colliderect(rect):
+          rect.union_ip(merged.pop(index))
+          index = 0
+        else:
+          index += 1
+      merged.append(rect)
+    return merged
+  
+  def update(self, regions):
+    """Pushes argument regions to the display and starts a new frame"""
+    if self.full:
+      pygame.display.flip()
+    elif regions != []:
+      pygame.display.update(regions)
+    self.dirty = []
+    self.full = False
+
+
+class Viewport:
+  """
+  This class fits an area of a fixed shape, the canvas, into a window of any size
+
+  The canvas is the largest area of the window with the shape it was designed at, centred with black
+  bars filling the rest. It is a subsurface of the window, so anything drawn on it is already on the
+  window and showing it is a plain display update, with nothing copied or scaled. When the window
+  changes size whatever is drawn on it has to be laid out again at the new scale.
+  """
+  def __init__(self, size, window = None):
+    """
+    :param size: the size the canvas was designed at, which sets its shape and what scale 1 is
+    :type size: tuple
+    """
+    self.size = size
+    self.resize(window)
+    
+  def resize(self, window = None):
+    """Fits the canvas to argument window, the display surface by default, call when the window changes size"""
+    self.window = window if window != None else pygame.display.get_surface()
+    width, height = self.size
+    self.scale = min(self.window.get_width()/width, self.window.get_height()/height)
+    self.rect = pygame.Rect(0, 0, max(1, round(width*self.scale)), max(1, round(height*self.scale)))
+    self.rect.center = self.window.get_rect().center
+    self.window.fill((0, 0, 0))
+    self.canvas = self.window.subsurface(self.rect)
+  
+  def to_canvas(self, position) -> tuple:
+    """Returns the point of the canvas at argument position of the window, e.g. the mouse"""
+    return (position[0] - self.rect.x, position[1] - self.rect.y)
+    
+  def present(self, regions) -> list:
+    """Returns the areas of the window that argument regions of the canvas cover, to be pushed to the display"""
+    return [pygame.Rect(region).move(self.rect.topleft) for region in regions]
+
+
+class Loader:
+  """
+  This class loads resources on a worker thread so the window can be drawn while they load
+
+  Jobs run one after another in the order they were added. Each one's result can be checked for with
+  ready and collected with get, so parts of the program can start as soon as what they need is loaded.
+  """
+  def __init__(self, event = None):
+    """
+    :param event: if given, an event of this type is posted after each job so a sleeping event loop wakes up
+    :type event: pygame.USEREVENT
+    """
+    self.event = event
+    self.jobs = []
+    self.results = {}
+    self.errors = {}
+    self.times = {}
+    self.condition = threading.Condition()
+    self.thread = None
+    
+  def add(self, name, function, *args):
+    """
+    This function adds a job to be run by the worker thread
+    
+    :param name: the name the result is stored under
+    :type name: str
+    
+    :param function: called with args, its return value is the result
+    :type function: callable
+    """
+    self.jobs.append((name, function, args))
+    
+  def start(self):
+    self.thread = threading.Thread(target=self.run, name="Loader", daemon=True)
+    self.thread.start()
+    
+  def run(self):
+    for name, function, args in self.jobs:
+      began = time.perf_counter()
+      try:
+        self.results[name] = function(*args)
+      except Exception as error:
+        # kept to be raised on whichever thread asks for the result
+        self.errors[name] = error
+      with self.condition:
+        self.times[name] = time.perf_counter() - began
+        self.condition.notify_all()
+      if self.event != None:
+        pygame.event.post(pygame.event.Event(self.event, name=name))
+    
+  def ready(self, *names) -> bool:
+    """Returns True once every one of argument names has finished loading, successfully or not"""
+    return all(name in self.results or name in self.errors for name in names)
+  
+  def progress(self) -> float:
+    """Returns the fraction of jobs that have finished"""
+    if self.jobs == []:
+      return 1
+    return len(self.times)/len(self.jobs)
+    
+  def get(self, name):
+    """Returns the result of job argument name, raising whatever it raised if it failed"""
+    if name in self.errors:
+      raise self.errors[name]
+    return self.results[name]
+  
+  def wait(self, name):
+    """Blocks until job argument name has finished and returns its result"""
+    with self.condition:
+      self.condition.wait_for(lambda: self.ready(name))
+    return self.get(name)
+
+
+class FramePacer:
+  """
+  This class decides how long the main loop waits between frames
+
+  While anything is animating, frames are paced by clock.tick at the cap for the current state. When
+  nothing is, the loop sleeps in pygame.event.wait until an event arrives (or idleTimeout ms pass),
+  so static screens cost next to nothing.
+  """
+  def __init__(self, caps = {}, default = 60, idleTimeout = 1000):
+    """
+    :param caps: the highest frame rate for each state
+    :type caps: {state: FPS}
+    
+    :param default: the frame rate cap for states not in caps
+    :type default: int
+    
+    :param idleTimeout: the longest the loop sleeps for when idle, in ms
+    :type idleTimeout: int
+    """
+    self.caps = dict(caps)
+    self.default = default
+    self.idleTimeout = idleTimeout
+    self.clock = pygame.time.Clock()
+    self.idle = False
+    
+  def set_cap(self, state, fps):
+    self.caps[state] = fps
+    
+  def get_cap(self, state) -> int:
+    return self.caps.get(state, self.default)
+    
+  def get_fps(self) -> float:
+    return self.clock.get_fps()
+    
+  def wait(self, state, active) -> list:
+    """Waits until the next frame is due and returns the events that arrived in the meantime"""
+    self.idle = not active
+    if active:
+      self.clock.tick(self.get_cap(state))
+      return pygame.event.get()
+    
+    event = pygame.event.wait(self.idleTimeout)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    events += pygame.event.get()
+    
+    # still capped, so a stream of events (e.g. mouse motion) can't make the loop spin
+    self.clock.tick(self.get_cap(state))
+    return events
+
+
+class _Span:
+  """Times one use of a Profiler span"""
+  __slots__ = ("profiler", "name", "began")
+  
+  def __init__(self, profiler, name):
+    self.profiler = profiler
+    self.name = name
+    
+  def __enter__(self):
+    self.began = time.perf_counter_ns()
+    return self
+  
+  def __exit__(self, *args):
+    self.profiler.record(self.name, self.began, time.perf_counter_ns())
+    
+    
+class _NullSpan:
+  """Does nothing, shared by every span of a NullProfiler"""
+  __slots__ = ()
+  
+  def __enter__(self):
+    return self
+  
+  def __exit__(self, *args):
+    pass
+  
+  
+class NullProfiler:
+  """
+  This class has the same methods as Profiler but does nothing, so profiling can be left in the main
+  loop at next to no cost when it is switched off
+  """
+  enabled = False
+  hud = False
+  SPAN = _NullSpan()
+  
+  def span(self, name):
+    return self.SPAN
+  
+  def frame(self):
+    pass
+  
+  def toggle_hud(self):
+    pass
+
+
+class Profiler:
+  """
+  This class times named spans of the main loop, frame by frame
+
+  The last `window` frames are kept for an on screen overlay of frame time percentiles and the average
+  time of each span per frame. Every span is also kept as a trace event, which export writes out in
+  Chrome's trace event format (open it in chrome://tracing or Perfetto).
+  """
+  enabled = True
+  
+  def __init__(self, window = 240, maxEvents = 1000000):
+    """
+    :param window: how many frames the overlay's statistics are taken over
+    :type window: int
+    
+    :param maxEvents: the most trace events kept, the oldest are dropped after that
+    :type maxEvents: int
+    """
+    self.window = window
+    self.hud = True
+    self.origin = time.perf_counter_ns()
+    self.events = deque(maxlen=maxEvents)
+    self.frameTimes = deque(maxlen=window)
+    self.spanTimes = {}
+    self.current = {}
+    self.frameStart = self.origin
+    self.frames = 0
+    
+    self.font = None
+    self.surface = None
+    self.lastRefresh = 0
+    
+  def span(self, name):
+    """Returns a context manager that times the code inside it as argument name"""
+    return _Span(self, name)
+  
+  def record(self, name, began, ended):
+    self.current[name] = self.current.get(name, 0) + ended - began
+    self.events.append((name, began, ended))
+    
+  def frame(self):
+    """Marks the end of a frame"""
+    now = time.perf_counter_ns()
+    self.frameTimes.append(now - self.frameStart)
+    self.events.append(("frame", self.frameStart, now))
+    for name in self.spanTimes.keys() | self.current.keys():
+      if name not in self.spanTimes:
+        self.spanTimes[name] = deque(maxlen=self.window)
+      self.spanTimes[name].append(self.current.get(name, 0))
+    self.current = {}
+    self.frameStart = now
+    self.frames += 1
+    
+  def toggle_hud(self):
+    self.hud = not self.hud
+    
+  @staticmethod
+  def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if ordered == []:
+      return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered)*fraction))]
+  
+  def summary(self) -> dict:
+    """Returns the frame time percentiles and the mean time per frame of each span, all in ms"""
+    return {
+      "frames" : self.frames,
+      "p50" : self.percentile(self.frameTimes, 0.5)/1e6,
+      "p95" : self.percentile(self.frameTimes, 0.95)/1e6,
+      "p99" : self.percentile(self.frameTimes, 0.99)/1e6,
+      "max" : max(self.frameTimes, default=0)/1e6,
+      "spans" : {name : sum(times)/len(times)/1e6 for name, times in self.spanTimes.items() if len(times) != 0},
+    }
+  
+  def get_rect(self, position):
+    """Returns the area the overlay covers when drawn at argument position"""
+    if self.surface == None:
+      return pygame.Rect(position, (0, 0))
+    return pygame.Rect(position, self.surface.get_size())
+    
+  def refresh(self):
+    """Renders the overlay again, at most four times a second so the numbers can be read"""
+    now = time.perf_counter_ns()
+    if self.surface != None and now - self.lastRefresh < 250000000:
+      return
+    self.lastRefresh = now
+    if self.font == None:
+      self.font = pygame.font.SysFont(None, 18)
+      
+    summary = self.summary()
+    lines = [f"frame p50 {summary['p50']:.2f} p95 {summary['p95']:.2f} p99 {summary['p99']:.2f} max {summary['max']:.2f} ms"]
+    for name, mean in sorted(summary["spans"].items(), key=lambda item: -item[1]):
+      lines.append(f"{name}: {mean:.3f} ms")
+      
+    # rendered straight from the font so the ever changing numbers don't churn the shared text cache
+    texts = [self.font.render(line, 1, (255, 255, 255)) for line in lines]
+    self.surface = pygame.Surface((max(text.get_width() for text in texts) + 8, sum(text.get_height() for text in texts) + 8), pygame.SRCALPHA)
+    self.surface.fill((0, 0, 0, 170))
+    y = 4
+    for text in texts:
+      self.surface.blit(text, (4, y))
+      y += text.get_height()
+    
+  def draw(self, window, position):
+    if self.hud and self.surface != None:
+      window.blit(self.surface, position)
+      
+  def export(self, path):
+    """Writes every kept span to argument path as Chrome trace event JSON"""
+    events = [{
+      "name" : name,
+      "ph" : "X",
+      "ts" : (began - self.origin)/1000,
+      "dur" : (ended - began)/1000,
+      "pid" : 1,
+      "tid" : 1,
+    } for name, began, ended in self.events]
+    with open(path, "w") as p:
+      json.dump({"traceEvents" : events, "displayTimeUnit" : "ms"}, p)
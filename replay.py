@@ -0,0 +1,153 @@
+import gzip
+import time
+import argparse
+
+from words import prompt, WORDS_FILE
+from packed import load_dictionary
+from engine import Engine, ManualClock, INITIAL_TIME, MAX_LIVES
+
+VERSION = 1
+
+# A replay is a text file (gzipped if its name ends in .gz) with a header line followed by one line
+# per call that changed the game:
+#
+#   # word bomb replay 1 initial_time=10 max_lives=5
+#   <ms since the recording began> <action> [argument]
+#
+# Actions:
+#   start <seed>        a game was started, its prompts are drawn from the seed
+#   prompt <prompt>     the prompt changed, only checked when replaying
+#   type <letter>       a letter was typed
+#   back                backspace was pressed
+#   input <text>        the input was replaced, by a hint
+#   submit <result>     the input was submitted, the result is checked when replaying
+#   update              the timer ran out
+#   menu                went back to the menu
+
+
+def open_log(path, mode):
+  """Opens argument path as text, through gzip if its name ends in .gz"""
+  if str(path).endswith(".gz"):
+    return gzip.open(path, mode + "t", encoding="ascii")
+  return open(path, mode, encoding="ascii")
+
+
+class Recorder:
+  """This class writes every call made to an Engine to a replay, used as the engine's recorder"""
+  def __init__(self, path, initial_time = INITIAL_TIME, max_lives = MAX_LIVES):
+    self.path = path
+    self.file = open_log(path, "w")
+    self.file.write(f"# word bomb replay {VERSION} initial_time={initial_time} max_lives={max_lives}\n")
+    self.origin = None
+
+  def record(self, time:int, action:str, argument = ""):
+    if self.origin == None:
+      self.origin = time
+    self.file.write(f"{time - self.origin} {action} {argument}".rstrip() + "\n")
+
+  def close(self):
+    if not self.file.closed:
+      self.file.close()
+
+
+class Replayer:
+  """
+  This class plays a replay back through an Engine
+
+  The engine runs on a ManualClock that is set to each line's time before it is applied, so the
+  game sees exactly the times it saw when it was recorded, whether the replay is played at real
+  speed or as fast as possible. Results and prompts that differ from the recording raise ValueError.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.settings = {"initial_time" : INITIAL_TIME, "max_lives" : MAX_LIVES}
+    self.entries = []
+
+    with open_log(path, "r") as p:
+      header = p.readline().split()
+      if header[0:4] != ["#", "word", "bomb", "replay"] or header[4] != str(VERSION):
+        raise ValueError("Not a replay: " + str(path))
+      for setting in header[5:]:
+        name, value = setting.split("=")
+        self.settings[name] = int(value)
+
+      for line in p:
+        parts = line.rstrip("\n").split(" ", 2)
+        self.entries.append((int(parts[0]), parts[1], parts[2] if len(parts) > 2 else ""))
+
+  def make_engine(self, words, prompts) -> Engine:
+    """Returns an engine set up like the recorded one, on a ManualClock"""
+    return Engine(words, prompts, clock=ManualClock(), **self.settings)
+
+  def apply(self, game:Engine, number:int):
+    """Applies entry argument number to argument game, at the time it was recorded"""
+    ms, action, argument = self.entries[number]
+    game.clock.now = ms
+
+    if action == "start":
+      game.start(int(argument))
+    elif action == "type":
+      game.type(argument)
+    elif action == "back":
+      game.backspace()
+    elif action == "input":
+      game.set_input(argument)
+    elif action == "menu":
+      game.go_to_menu()
+    elif action == "submit":
+      result = game.submit()
+      if result != argument:
+        raise ValueError(f"Line {number + 2}: submitting gave {result} instead of {argument}")
+    elif action == "update":
+      if game.update() == []:
+        raise ValueError(f"Line {number + 2}: the timer had not run out")
+    elif action == "prompt":
+      if game.prompt != argument:
+        raise ValueError(f"Line {number + 2}: the prompt was {game.prompt} instead of {argument}")
+    else:
+      raise ValueError(f"Line {number + 2}: unknown action {action}")
+
+  def play(self, game:Engine, realtime = False, callback = None) -> Engine:
+    """
+    This function plays every entry through argument game
+
+    :param realtime: waits between entries as long as was waited when recording
+    :type realtime: bool
+
+    :param callback: called with the game and the entry after each entry, to show the replay
+    :type callback: callable
+    """
+    began = time.perf_counter()
+    for number in range(len(self.entries)):
+      if realtime:
+        delay = began + self.entries[number][0]/1000 - time.perf_counter()
+        if delay > 0:
+          time.sleep(delay)
+      self.apply(game, number)
+      if callback != None:
+        callback(game, self.entries[number])
+    return game
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Plays back a recorded word bomb session")
+  parser.add_argument("replay", help="a replay written by python main.py --record <path>")
+  parser.add_argument("--realtime", action="store_true", help="plays at the speed it was recorded, printing each entry")
+  parser.add_argument("-r", "--repeat", type=int, default=1, help="plays the replay this many times, for timing")
+  arguments = parser.parse_args()
+
+  replayer = Replayer(arguments.replay)
+  words = load_dictionary()
+  prompts = prompt(source=WORDS_FILE) # counted like the game counts them, so the same prompts come up
+  show = (lambda game, entry: print(*entry)) if arguments.realtime else None
+
+  samples = []
+  for _ in range(arguments.repeat):
+    began = time.perf_counter()
+    game = replayer.play(replayer.make_engine(words, prompts), arguments.realtime, show)
+    samples.append(time.perf_counter() - began)
+
+  fastest = min(samples)
+  recorded = replayer.entries[-1][0] if replayer.entries != [] else 0
+  print(f"{len(replayer.entries)} entries, {recorded/1000:.1f} s recorded, replayed in {fastest*1000:.2f} ms ({len(replayer.entries)/max(fastest, 1e-9):.0f} entries/s)")
+  print(f"Ended {game.state} with {game.lives} lives and {len(game.words_used)} words used")
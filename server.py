@@ -0,0 +1,349 @@
+import sys
+import json
+import asyncio
+import argparse
+
+from words import prompt, WORDS_FILE
+from packed import load_dictionary
+from shared import SHARED_NAME, attach
+from solver import Solver, Bot, PROFILES
+from engine import INITIAL_TIME, MAX_LIVES, VALID, USED, INVALID
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Every message is one JSON object per line.
+#
+# Client -> server:
+#   {"type": "join", "room": str, "name": str}
+#   {"type": "start"}
+#   {"type": "add bot", "level": "easy" | "medium" | "hard"}
+#   {"type": "submit", "word": str}
+#   {"type": "leave"}
+#
+# Server -> client:
+#   {"type": "joined", "room": str, "players": [str]}
+#   {"type": "turn", "player": str, "prompt": str, "time": seconds}
+#   {"type": "result", "player": str, "word": str, "result": "valid" | "used" | "invalid"}
+#   {"type": "lose life", "player": str, "lives": int}
+#   {"type": "game over", "winner": str | None, "words used": int}
+#   {"type": "error", "message": str}
+
+
+class Player:
+  """This class holds a connected player and how many lives they have left"""
+  def __init__(self, name, writer):
+    self.name = name
+    self.writer = writer
+    self.lives = 0
+
+  def send(self, message:dict):
+    """Queues argument message to be sent to the player"""
+    if not self.writer.is_closing():
+      self.writer.write((json.dumps(message) + "\n").encode())
+
+
+class BotPlayer(Player):
+  """This class seats a computer player in a room, it has no connection so messages to it are dropped"""
+  def __init__(self, name, bot:Bot):
+    super().__init__(name, None)
+    self.bot = bot
+
+  def send(self, message:dict):
+    pass
+
+
+class Room:
+  """
+  This class runs a game of word bomb between the players of a room
+
+  The bomb is passed between the players in turn. Instead of polling the time every frame, each turn
+  schedules a single callback on the event loop that fires when the bomb goes off, and is cancelled
+  as soon as the turn ends. A computer player's answer is scheduled the same way, for when it would
+  have finished typing it.
+  """
+  def __init__(self, name, words, prompts, initial_time = INITIAL_TIME, max_lives = MAX_LIVES):
+    self.name = name
+    self.words = words
+    self.prompts = prompts.fork() # shares the prompt tables but keeps its own history of recent prompts
+    self.initial_time = initial_time
+    self.max_lives = max_lives
+
+    self.players = []
+    self.state = "lobby"
+    self.turn = 0
+    self.prompt = ""
+    self.words_used = set()
+    self.timer = None
+    self.move = None # the answer of the computer player whose turn it is
+
+  def broadcast(self, message:dict):
+    for player in self.players:
+      player.send(message)
+
+  def add(self, player:Player):
+    self.players.append(player)
+    self.broadcast({"type" : "joined", "room" : self.name, "players" : [player.name for player in self.players]})
+
+  def add_bot(self, solver:Solver, level = "medium") -> BotPlayer:
+    """Seats a computer player of argument level, between games only"""
+    if self.state == "game":
+      return None
+    number = sum(1 for player in self.players if isinstance(player, BotPlayer)) + 1
+    player = BotPlayer(f"bot {number} ({level})", Bot(solver, PROFILES[level]))
+    self.add(player)
+    return player
+
+  def humans(self) -> list:
+    return [player for player in self.players if not isinstance(player, BotPlayer)]
+
+  def remove(self, player:Player):
+    index = self.players.index(player)
+    self.players.pop(index)
+    if self.state != "game":
+      return
+
+    # keeps the bomb with whoever's turn it was, or passes it on if it was the leaving player's turn
+    if index < self.turn:
+      self.turn -= 1
+      if self.finished():
+        self.end()
+    elif index == self.turn:
+      self.turn -= 1
+      self.next_turn()
+    elif self.finished():
+      self.end()
+
+  def alive(self) -> list:
+    return [player for player in self.players if player.lives > 0]
+
+  def finished(self) -> bool:
+    """Returns True once the game can't carry on: nobody alive, or one player left in a multiplayer game"""
+    alive = len(self.alive())
+    return alive == 0 or (alive == 1 and len(self.players) > 1)
+
+  def start(self):
+    """Starts a new game with every player at full lives"""
+    if self.state == "game" or self.players == []:
+      return
+    for player in self.players:
+      player.lives = self.max_lives
+    self.words_used = set()
+    self.prompts.forget_used()
+    self.state = "game"
+    self.turn = -1
+    self.next_turn()
+
+  def next_turn(self):
+    """Passes the bomb to the next player that is still alive, with a new prompt"""
+    if self.finished():
+      self.end()
+      return
+    self.turn = (self.turn + 1) % len(self.players)
+    while self.players[self.turn].lives <= 0:
+      self.turn = (self.turn + 1) % len(self.players)
+
+    player = self.players[self.turn]
+    self.prompt = self.prompts.generate_prompt(len(self.words_used), self.max_lives - player.lives, self.words_used)
+    self.schedule()
+    self.broadcast({"type" : "turn", "player" : self.players[self.turn].name, "prompt" : self.prompt, "time" : self.initial_time})
+    if isinstance(player, BotPlayer):
+      self.play_bot(player)
+
+  def play_bot(self, player:BotPlayer):
+    """Schedules argument player's answer for when it would have typed it, or nothing if it can't think of one"""
+    keys = player.bot.play(self.prompt, self.words_used)
+    if keys == []:
+      return
+    word = "".join(key for delay, key in keys).strip()
+    delay = sum(delay for delay, key in keys)/1000
+    self.move = asyncio.get_running_loop().call_later(delay, self.submit, player, word)
+
+  def cancel_move(self):
+    if self.move != None:
+      self.move.cancel()
+      self.move = None
+
+  def schedule(self):
+    """Replaces the running timer with one that explodes the bomb after a full turn"""
+    if self.timer != None:
+      self.timer.cancel()
+    self.cancel_move()
+    self.timer = asyncio.get_running_loop().call_later(self.initial_time, self.explode)
+
+  def explode(self):
+    """Called by the event loop when the current player runs out of time"""
+    self.timer = None
+    self.cancel_move()
+    if self.state != "game":
+      return
+    player = self.players[self.turn]
+    player.lives -= 1
+    self.broadcast({"type" : "lose life", "player" : player.name, "lives" : player.lives})
+    self.next_turn()
+
+  def submit(self, player:Player, word:str):
+    """Checks a word submitted by argument player, passing the bomb on if it is valid"""
+    if self.state != "game" or self.players[self.turn] is not player:
+      player.send({"type" : "error", "message" : "it is not your turn"})
+      return
+
+    word = word.strip().upper()
+    if self.words.search_word(word) and (self.prompt in word) and (word not in self.words_used):
+      self.words_used.add(word)
+      self.prompts.use(word)
+      result = VALID
+    elif word in self.words_used:
+      result = USED
+    else:
+      result = INVALID
+
+    self.broadcast({"type" : "result", "player" : player.name, "word" : word, "result" : result})
+    if result == VALID:
+      self.next_turn()
+
+  def end(self):
+    if self.timer != None:
+      self.timer.cancel()
+      self.timer = None
+    self.cancel_move()
+    self.state = "lobby"
+    alive = self.alive()
+    winner = alive[0].name if len(alive) == 1 and len(self.players) > 1 else None
+    self.broadcast({"type" : "game over", "winner" : winner, "words used" : len(self.words_used)})
+
+
+class Server:
+  """This class accepts connections and sorts players into rooms, which all share one dictionary and prompt list"""
+  def __init__(self, words = None, prompts = None, initial_time = INITIAL_TIME, max_lives = MAX_LIVES):
+    self.words = words if words != None else load_dictionary()
+    self.prompts = prompts if prompts != None else prompt(source=WORDS_FILE)
+    self.initial_time = initial_time
+    self.max_lives = max_lives
+    self.rooms = {}
+    self.solver = None # only made once a computer player is added, as it loads the substring index
+
+  def get_solver(self) -> Solver:
+    if self.solver == None:
+      self.solver = Solver(self.words)
+    return self.solver
+
+  def get_room(self, name:str) -> Room:
+    if name not in self.rooms:
+      self.rooms[name] = Room(name, self.words, self.prompts, self.initial_time, self.max_lives)
+    return self.rooms[name]
+
+  def leave(self, room:Room, player:Player):
+    room.remove(player)
+    # rooms without people are dropped so thousands of short lived rooms don't pile up, or bots play on forever
+    if room.humans() == []:
+      room.end()
+      del self.rooms[room.name]
+
+  async def handle(self, reader, writer):
+    """Runs for as long as one client is connected"""
+    room = None
+    player = None
+    try:
+      while True:
+        line = await reader.readline()
+        if line == b"":
+          break
+        try:
+          message = json.loads(line)
+          kind = message["type"]
+        except (ValueError, KeyError, TypeError):
+          writer.write(b'{"type": "error", "message": "bad message"}\n')
+          continue
+
+        if kind == "join" and room == None:
+          player = Player(str(message.get("name", "player")), writer)
+          room = self.get_room(str(message.get("room", "lobby")))
+          room.add(player)
+        elif room == None:
+          writer.write(b'{"type": "error", "message": "join a room first"}\n')
+        elif kind == "start":
+          room.start()
+        elif kind == "add bot":
+          level = str(message.get("level", "medium"))
+          if level not in ("easy", "medium", "hard"):
+            player.send({"type" : "error", "message" : "unknown bot level"})
+          else:
+            solver = await asyncio.get_running_loop().run_in_executor(None, self.get_solver)
+            if room.add_bot(solver, level) == None:
+              player.send({"type" : "error", "message" : "bots can only join between games"})
+        elif kind == "submit":
+          room.submit(player, str(message.get("word", "")))
+        elif kind == "leave":
+          break
+
+        await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      if room != None:
+        self.leave(room, player)
+      writer.close()
+
+  async def serve(self, host = HOST, port = PORT):
+    server = await asyncio.start_server(self.handle, host, port)
+    async with server:
+      await server.serve_forever()
+
+
+async def client(room:str, name:str, host = HOST, port = PORT):
+  """
+  A local client for testing the server from a terminal
+
+  Lines typed are submitted as words, apart from /start, /bot [level] and /leave. Every message from the server is printed.
+  """
+  reader, writer = await asyncio.open_connection(host, port)
+  send = lambda message: writer.write((json.dumps(message) + "\n").encode())
+  send({"type" : "join", "room" : room, "name" : name})
+
+  async def show():
+    while True:
+      line = await reader.readline()
+      if line == b"":
+        break
+      print(json.loads(line))
+
+  printer = asyncio.ensure_future(show())
+  loop = asyncio.get_running_loop()
+  while not printer.done():
+    line = await loop.run_in_executor(None, sys.stdin.readline)
+    if line == "" or line.strip() == "/leave":
+      send({"type" : "leave"})
+      break
+    elif line.strip() == "/start":
+      send({"type" : "start"})
+    elif line.strip().startswith("/bot"):
+      send({"type" : "add bot", "level" : line.split()[1] if len(line.split()) > 1 else "medium"})
+    else:
+      send({"type" : "submit", "word" : line.strip()})
+    await writer.drain()
+
+  await writer.drain()
+  writer.close()
+  printer.cancel()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Word bomb room server")
+  parser.add_argument("mode", choices=["serve", "client"])
+  parser.add_argument("--host", default=HOST)
+  parser.add_argument("--port", type=int, default=PORT)
+  parser.add_argument("--room", default="lobby")
+  parser.add_argument("--name", default="player")
+  parser.add_argument("--shared", nargs="?", const=SHARED_NAME, help="reads the dictionary published by python shared.py instead of loading a copy")
+  arguments = parser.parse_args()
+
+  if arguments.mode == "serve":
+    words = None
+    if arguments.shared:
+      words = attach(arguments.shared)
+      if words == None:
+        print("Nothing has published the dictionary as", arguments.shared, "so a copy is loaded", file=sys.stderr)
+    asyncio.run(Server(words).serve(arguments.host, arguments.port))
+  else:
+    asyncio.run(client(arguments.room, arguments.name, arguments.host, arguments.port))
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import signal
+import struct
+import weakref
+from multiprocessing import shared_memory, resource_tracker
+
+from words import WORDS_FILE
+from packed import PACKED_FILE, PackedDictionary, pack
+
+SHARED_NAME = "word_bomb_dictionary"
+
+
+def publish(name=SHARED_NAME, path=PACKED_FILE, source=WORDS_FILE) -> shared_memory.SharedMemory:
+  """
+  This function copies the packed dictionary into a new shared memory block called argument name
+
+  The word list is packed first if the packed file is missing or out of date. The block stays
+  available until the returned SharedMemory is unlinked, so the process that published it should
+  keep it for as long as workers may attach.
+  """
+  try:
+    stale = PackedDictionary(path)
+    fresh = not stale.is_stale(source)
+    stale.close()
+  except (OSError, ValueError):
+    fresh = False
+  if not fresh:
+    pack(source, path)
+
+  size = os.path.getsize(path)
+  memory = shared_memory.SharedMemory(name, create=True, size=size)
+  with open(path, "rb") as p:
+    p.readinto(memory.buf[:size])
+  return memory
+
+
+def release(views, memory):
+  """Lets go of argument views of a shared memory block, then detaches from it, as it can't be closed while views of it exist"""
+  for view in views:
+    if isinstance(view, memoryview):
+      view.release()
+  memory.close()
+
+
+class SharedDictionary(PackedDictionary):
+  """
+  This class is a packed dictionary read in place from a shared memory block made by publish
+
+  The block is the packed file byte for byte, offsets table and all, so attaching parses nothing
+  and copies nothing: every worker on the host reads the same physical pages, and a new worker is
+  ready as soon as the block is mapped.
+  """
+  def __init__(self, name=SHARED_NAME):
+    try:
+      self.memory = shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+      # before python 3.13 every attached block is tracked and would be unlinked when the worker exits
+      self.memory = shared_memory.SharedMemory(name)
+      if os.name == "posix":
+        # the tracker knows posix blocks by their name with a leading slash
+        resource_tracker.unregister("/" + self.memory.name, "shared_memory")
+    self.buffer = self.memory.buf.toreadonly()
+    try:
+      super().__init__(name, buffer=self.buffer)
+    except (ValueError, struct.error):
+      release([self.buffer], self.memory)
+      raise
+    # detaches when close is called, the dictionary is garbage collected or the interpreter exits, whichever is first
+    self.finalizer = weakref.finalize(self, release, [self.offsets, self.view, self.buffer], self.memory)
+
+  def is_stale(self, source=WORDS_FILE) -> bool:
+    # the publisher checked the word list when it made the block
+    return False
+
+  def close(self):
+    """Detaches from the block, which stays available to other workers"""
+    self.finalizer()
+
+
+def attach(name=SHARED_NAME):
+  """Returns the dictionary published under argument name, or None if nothing has published it"""
+  try:
+    return SharedDictionary(name)
+  except FileNotFoundError:
+    return None
+
+
+if __name__ == "__main__":
+  # python shared.py [name] publishes the dictionary and keeps it available until stopped
+  name = sys.argv[1] if len(sys.argv) > 1 else SHARED_NAME
+  began = time.perf_counter()
+  memory = publish(name)
+  print(f"Published {memory.size} bytes as {name} in {(time.perf_counter() - began)*1000:.0f} ms, stop with ctrl+c")
+
+  signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+  try:
+    while True:
+      time.sleep(3600)
+  except (KeyboardInterrupt, SystemExit):
+    pass
+  finally:
+    memory.close()
+    memory.unlink()
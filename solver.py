@@ -0,0 +1,185 @@
+import math
+import random
+import string
+
+
+class Profile:
+  """This class describes how a computer player picks its words and how quickly it plays them"""
+  def __init__(self, length = "any", obscurity = 0.0, letters = 0.0, sample = 64, reaction = 1500, speed = 6.0, jitter = 0.25, miss = 0.0):
+    """
+    :param length: prefers "short" or "long" words, or "any" length
+    :type length: str
+
+    :param obscurity: how much to prefer words made of rare letters, from -1 (common) to 1 (obscure)
+    :type obscurity: float
+
+    :param letters: how much to prefer words that use letters that haven't been used yet
+    :type letters: float
+
+    :param sample: the most candidate words looked at per answer, which bounds the time taken
+    :type sample: int
+
+    :param reaction: the mean time in ms before the first letter is typed
+    :type reaction: float
+
+    :param speed: the mean number of letters typed per second
+    :type speed: float
+
+    :param jitter: how much each delay varies, as a fraction of it
+    :type jitter: float
+
+    :param miss: the chance of not thinking of a word at all on a prompt with very few solutions
+    :type miss: float
+    """
+    if length not in ("short", "long", "any"):
+      raise ValueError("Length does not exist: " + str(length))
+    self.length = length
+    self.obscurity = obscurity
+    self.letters = letters
+    self.sample = sample
+    self.reaction = reaction
+    self.speed = speed
+    self.jitter = jitter
+    self.miss = miss
+
+
+PROFILES = {
+  "easy" : Profile(length="short", obscurity=-1.0, sample=16, reaction=2500, speed=3.0, jitter=0.4, miss=0.5),
+  "medium" : Profile(length="any", obscurity=-0.3, sample=48, reaction=1500, speed=5.0, jitter=0.3, miss=0.2),
+  "hard" : Profile(length="long", obscurity=0.5, letters=1.0, sample=128, reaction=700, speed=9.0, jitter=0.2, miss=0.0),
+  "hint" : Profile(length="short", obscurity=-1.0, sample=128, reaction=0, speed=0, jitter=0),
+}
+
+
+class Solver:
+  """
+  This class answers prompts from the dictionary's substring index
+
+  Rather than scoring every word that contains the prompt (there can be over a hundred thousand),
+  a window of at most profile.sample unused candidates is read from a random point of the prompt's
+  posting list and the best of those is picked, so each answer takes well under a millisecond.
+
+  The word list has no frequency information, so how common a word is is judged by its letters: a
+  word's obscurity is the mean rarity of its letters across the dictionary.
+  """
+  def __init__(self, words, seed = None):
+    """
+    :param words: the dictionary to answer from
+    :type words: dictionary or PackedDictionary
+
+    :param seed: seeds the random choices so answers can be reproduced
+    :type seed: int
+    """
+    self.words = words
+    self.index = words.get_index()
+    self.random = random.Random(seed)
+
+    # rarity of each letter, -log of the fraction of words that contain it
+    total = len(self.index.words)
+    self.rarity = {}
+    for letter in string.ascii_lowercase:
+      count = self.index.count_solutions(letter)
+      self.rarity[letter] = -math.log(count/total) if count != 0 else 0
+    most = max(self.rarity.values()) or 1
+    for letter in self.rarity:
+      self.rarity[letter] /= most
+
+  def obscurity(self, word:str) -> float:
+    """Returns how obscure argument word looks from its letters, from 0 to 1"""
+    rarity = self.rarity
+    return sum(rarity.get(letter, 0) for letter in word)/len(word)
+
+  def candidates(self, prompt:str, used = (), limit = 64) -> list:
+    """Returns up to argument limit words containing argument prompt that aren't in argument used, in upper case"""
+    text = prompt.strip().lower()
+    words = self.index.words
+    posting = self.index._candidates(text)
+    if len(posting) == 0:
+      return []
+
+    found = []
+    start = self.random.randrange(len(posting))
+    for step in range(len(posting)):
+      word = words[posting[(start + step) % len(posting)]]
+      # long prompts come from a fragment's posting list so still have to be checked
+      if text in word and word.upper() not in used:
+        found.append(word.upper())
+        if len(found) >= limit:
+          break
+    return found
+
+  def score(self, word:str, profile:Profile, unused = None) -> float:
+    """Returns how much argument profile likes argument word, higher is better"""
+    score = 0.0
+    if profile.length == "short":
+      score -= len(word)
+    elif profile.length == "long":
+      score += len(word)
+    score += profile.obscurity*self.obscurity(word.lower())*10
+    if unused != None and profile.letters != 0:
+      score += profile.letters*len(unused.intersection(word.lower()))
+    return score
+
+  def solve(self, prompt:str, used = (), profile = PROFILES["medium"], unused = None) -> list:
+    """
+    This function returns candidate words for argument prompt, best first for argument profile
+
+    :param used: words that have already been played, in upper case
+    :type used: set
+
+    :param unused: letters the player hasn't used yet, for profiles that like using new letters
+    :type unused: set
+    """
+    found = self.candidates(prompt, used, profile.sample)
+    found.sort(key=lambda word: self.score(word, profile, unused), reverse=True)
+    return found
+
+  def hint(self, prompt:str, used = ()) -> str:
+    """Returns one easy word for argument prompt, or "" if there are none left"""
+    found = self.solve(prompt, used, PROFILES["hint"])
+    return found[0] if found != [] else ""
+
+
+class Bot:
+  """This class is a computer player that answers with a Solver and types like a person would"""
+  def __init__(self, solver:Solver, profile = PROFILES["medium"], seed = None):
+    self.solver = solver
+    self.profile = profile
+    self.random = random.Random(seed)
+    self.unused = set(string.ascii_lowercase)
+
+  def vary(self, ms:float) -> float:
+    """Returns argument ms give or take the profile's jitter"""
+    return max(0.0, self.random.gauss(ms, ms*self.profile.jitter))
+
+  def think(self, prompt:str) -> float:
+    """Returns how long the bot takes before typing, longer for prompts with fewer solutions"""
+    count = self.solver.index.count_solutions(prompt)
+    difficulty = 1 + 4/math.log(count + 2)
+    return self.vary(self.profile.reaction*difficulty)
+
+  def play(self, prompt:str, used = ()) -> list:
+    """
+    This function decides the bot's answer to argument prompt
+
+    Returns a list of (delay in ms, key) pairs, where each delay is from the previous key and the keys
+    are the letters of the word followed by "\n" for enter. The list is empty if the bot can't think
+    of a word and will let the bomb go off.
+    """
+    rare = self.solver.index.count_solutions(prompt) < 50
+    if rare and self.random.random() < self.profile.miss:
+      return []
+    found = self.solver.solve(prompt, used, self.profile, self.unused)
+    if found == []:
+      return []
+
+    word = found[0]
+    self.unused.difference_update(word.lower())
+    if self.unused == set():
+      self.unused = set(string.ascii_lowercase)
+
+    keystroke = 1000/self.profile.speed if self.profile.speed > 0 else 0
+    keys = [(self.think(prompt), word[0])]
+    keys += [(self.vary(keystroke), letter) for letter in word[1:]]
+    keys.append((self.vary(keystroke), "\n"))
+    return keys
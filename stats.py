@@ -0,0 +1,269 @@
+import math
+import time
+import queue
+import sqlite3
+import threading
+
+STATS_FILE = "stats.sqlite3"
+
+# the longest close and queries wait for the writer thread, in seconds
+TIMEOUT = 5
+
+
+class UsedWords:
+  """This class keeps the words used in a game in the order they were played, with a set so membership checks don't scan them"""
+  def __init__(self, words = ()):
+    self.order = []
+    self.seen = set()
+    self.letters = 0
+    for word in words:
+      self.append(word)
+
+  def append(self, word:str):
+    if word not in self.seen:
+      self.seen.add(word)
+      self.order.append(word)
+      self.letters += len(word)
+
+  def __contains__(self, word):
+    return word in self.seen
+
+  def __len__(self):
+    return len(self.order)
+
+  def __iter__(self):
+    return iter(self.order)
+
+  def __getitem__(self, index):
+    return self.order[index]
+
+
+class Running:
+  """This class keeps the count, mean, spread and range of a stream of numbers without storing them"""
+  def __init__(self):
+    self.count = 0
+    self.mean = 0.0
+    self.squares = 0.0 # sum of squared differences from the mean, updated with Welford's method
+    self.low = None
+    self.high = None
+
+  def add(self, value:float):
+    self.count += 1
+    difference = value - self.mean
+    self.mean += difference/self.count
+    self.squares += difference*(value - self.mean)
+    self.low = value if self.low == None else min(self.low, value)
+    self.high = value if self.high == None else max(self.high, value)
+
+  def stdev(self) -> float:
+    return math.sqrt(self.squares/(self.count - 1)) if self.count > 1 else 0.0
+
+
+class GameStats:
+  """
+  This class gathers the statistics of one game as it is played
+
+  Everything is updated once per turn or keystroke, so nothing has to be worked out from the whole
+  game when it ends and an empty game has nothing to divide by zero.
+  """
+  def __init__(self):
+    self.used = UsedWords()
+    self.reaction = Running() # ms from a prompt appearing to the first letter being typed
+    self.turn = Running() # ms from a prompt appearing to a word being accepted
+    self.length = Running() # letters in each accepted word
+    self.prompts = {} # prompt -> [turns it was given for, turns it was solved in]
+
+    self.prompt = None
+    self.shown = 0
+    self.typed = False
+
+  def show(self, prompt:str, now:int):
+    """Starts a turn on argument prompt at time argument now"""
+    self.prompt = prompt
+    self.shown = now
+    self.typed = False
+    if prompt not in self.prompts:
+      self.prompts[prompt] = [0, 0]
+    self.prompts[prompt][0] += 1
+
+  def key(self, now:int):
+    """Records a key press, only the first of each turn counts towards the reaction time"""
+    if not self.typed and self.prompt != None:
+      self.typed = True
+      self.reaction.add(now - self.shown)
+
+  def solve(self, word:str, now:int):
+    """Ends the turn with argument word accepted"""
+    self.used.append(word)
+    self.length.add(len(word))
+    self.turn.add(now - self.shown)
+    if self.prompt != None:
+      self.prompts[self.prompt][1] += 1
+    self.prompt = None
+
+  def fail(self):
+    """Ends the turn with the bomb going off"""
+    self.prompt = None
+
+  @property
+  def words(self) -> int:
+    return len(self.used)
+
+  def success_rate(self, prompt:str) -> float:
+    """Returns the fraction of turns on argument prompt that were solved, or None if it never came up"""
+    if prompt not in self.prompts:
+      return None
+    turns, solved = self.prompts[prompt]
+    return solved/turns
+
+
+class NullStatsStore:
+  """
+  This class has the same methods as StatsStore but keeps nothing, used when the database can't be
+  opened so the game still plays without stats
+  """
+  error = None
+
+  def save(self, player:str, stats:GameStats, time_used:int, seed = None):
+    pass
+
+  def flush(self, timeout = TIMEOUT) -> bool:
+    return True
+
+  def close(self, timeout = TIMEOUT) -> bool:
+    return True
+
+  def query(self, sql:str, parameters = ()) -> list:
+    return []
+
+  def leaderboard(self, limit = 10) -> list:
+    return []
+
+  def history(self, player:str, limit = 20) -> list:
+    return []
+
+  def best(self, player:str) -> int:
+    return 0
+
+  def prompt_success(self, minimum = 5, limit = 20) -> list:
+    return []
+
+
+class StatsStore:
+  """
+  This class saves finished games to a SQLite database and answers leaderboard and history queries
+
+  Saving only puts a copy of the game's numbers on a queue. A background thread writes everything
+  that has queued up in one transaction, so the game loop never waits on the disk.
+  """
+  def __init__(self, path = STATS_FILE):
+    self.path = path
+    self.error = None # the last error the writer thread hit, games that failed to save are dropped
+    self.connect().close() # makes the tables, so a bad path fails here rather than on the thread
+    self.queue = queue.Queue()
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    self.thread.start()
+
+  def connect(self) -> sqlite3.Connection:
+    connection = sqlite3.connect(self.path)
+    connection.executescript("""
+      CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        player TEXT NOT NULL,
+        finished REAL NOT NULL,
+        seed INTEGER,
+        words INTEGER NOT NULL,
+        letters INTEGER NOT NULL,
+        time_used INTEGER NOT NULL,
+        mean_reaction REAL,
+        mean_turn REAL,
+        mean_length REAL
+      );
+      CREATE INDEX IF NOT EXISTS sessions_player ON sessions (player, finished);
+      CREATE TABLE IF NOT EXISTS prompts (
+        session INTEGER NOT NULL REFERENCES sessions (id),
+        prompt TEXT NOT NULL,
+        turns INTEGER NOT NULL,
+        solved INTEGER NOT NULL
+      );
+      CREATE INDEX IF NOT EXISTS prompts_prompt ON prompts (prompt);
+    """)
+    return connection
+
+  def save(self, player:str, stats:GameStats, time_used:int, seed = None):
+    """Queues a finished game to be written"""
+    mean = lambda running: running.mean if running.count > 0 else None
+    session = (player, time.time(), seed, stats.words, stats.used.letters, time_used, mean(stats.reaction), mean(stats.turn), mean(stats.length))
+    prompts = [(prompt, turns, solved) for prompt, (turns, solved) in stats.prompts.items()]
+    self.queue.put((session, prompts))
+
+  def run(self):
+    connection = None
+    running = True
+    while running:
+      batch = [self.queue.get()]
+      while True:
+        try:
+          batch.append(self.queue.get_nowait())
+        except queue.Empty:
+          break
+      # checked before writing, so a batch that fails to write still stops the thread
+      running = None not in batch
+      games = [item for item in batch if item != None]
+
+      try:
+        if connection == None:
+          connection = self.connect()
+        with connection:
+          for session, prompts in games:
+            cursor = connection.execute("INSERT INTO sessions (player, finished, seed, words, letters, time_used, mean_reaction, mean_turn, mean_length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", session)
+            connection.executemany("INSERT INTO prompts (session, prompt, turns, solved) VALUES (?, ?, ?, ?)", [(cursor.lastrowid, *prompt) for prompt in prompts])
+      except sqlite3.Error as error:
+        self.error = error
+      finally:
+        for _ in batch:
+          self.queue.task_done()
+    if connection != None:
+      connection.close()
+
+  def flush(self, timeout = TIMEOUT) -> bool:
+    """Waits until every queued game has been written, or argument timeout seconds, and returns whether they were"""
+    ends = time.monotonic() + timeout
+    with self.queue.all_tasks_done:
+      while self.queue.unfinished_tasks > 0:
+        left = ends - time.monotonic()
+        if left <= 0 or not self.thread.is_alive():
+          return False
+        self.queue.all_tasks_done.wait(min(left, 0.1))
+    return True
+
+  def close(self, timeout = TIMEOUT) -> bool:
+    """Writes anything still queued and stops the writer thread, waiting at most argument timeout seconds, and returns whether it stopped"""
+    if self.thread.is_alive():
+      self.queue.put(None)
+      self.thread.join(timeout)
+    return not self.thread.is_alive()
+
+  def query(self, sql:str, parameters = ()) -> list:
+    self.flush()
+    connection = self.connect()
+    try:
+      return connection.execute(sql, parameters).fetchall()
+    finally:
+      connection.close()
+
+  def leaderboard(self, limit = 10) -> list:
+    """Returns the best games as (player, words, time used in ms, finished) rows, most words first"""
+    return self.query("SELECT player, words, time_used, finished FROM sessions ORDER BY words DESC, time_used ASC LIMIT ?", (limit,))
+
+  def history(self, player:str, limit = 20) -> list:
+    """Returns argument player's latest games as (finished, words, time used, mean reaction, mean length) rows, newest first"""
+    return self.query("SELECT finished, words, time_used, mean_reaction, mean_length FROM sessions WHERE player = ? ORDER BY finished DESC LIMIT ?", (player, limit))
+
+  def best(self, player:str) -> int:
+    """Returns the most words argument player has used in one game, 0 if they haven't played"""
+    return self.query("SELECT COALESCE(MAX(words), 0) FROM sessions WHERE player = ?", (player,))[0][0]
+
+  def prompt_success(self, minimum = 5, limit = 20) -> list:
+    """Returns the hardest prompts given at least argument minimum times, as (prompt, turns, success rate) rows"""
+    return self.query("SELECT prompt, SUM(turns), CAST(SUM(solved) AS REAL)/SUM(turns) AS rate FROM prompts GROUP BY prompt HAVING SUM(turns) >= ? ORDER BY rate ASC LIMIT ?", (minimum, limit))
@@ -0,0 +1,251 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import bisect
+from array import array
+
+from words import WORDS_FILE, dictionary, source_stamp
+
+SUFFIX_ARRAY_FILE = "all words.sa"
+
+# magic, version, word count, text length, suffix count, source size, source mtime
+HEADER = struct.Struct("<4sIIIIQQ")
+MAGIC = b"WBSA"
+VERSION = 1
+
+
+class SuffixArray:
+  """
+  This class is a suffix array over every word of the dictionary, joined by newlines
+
+  Each suffix only runs to the end of its word, so sorting them is cheap and any substring query
+  is answered with two binary searches: the matches for a pattern are one contiguous run of the
+  array. Built arrays are saved to disk and memory mapped when loaded, so loading costs next to
+  nothing and the arrays are shared between processes.
+  """
+  def __init__(self, text, offsets, suffixes, base = 0, source = None):
+    """
+    :param text: the words joined by newlines, or a memory map it starts at argument base of
+    :type text: bytes or mmap.mmap
+
+    :param offsets: where each word starts in the text, followed by the end of the text
+    :type offsets: array of ints
+
+    :param suffixes: the positions of the text's suffixes in sorted order
+    :type suffixes: array of ints
+    """
+    self.text = text
+    self.base = base
+    self.offsets = offsets
+    self.suffixes = suffixes
+    self.count_words = len(offsets) - 1
+    self.source = source
+
+  @classmethod
+  def build(cls, words, source = WORDS_FILE):
+    """Builds the suffix array over argument words"""
+    text = bytearray()
+    offsets = array("I", [0])
+    for word in words:
+      text += word.lower().encode("ascii") + b"\n"
+      offsets.append(len(text))
+    text = bytes(text)
+
+    # where the word each position is in ends, so a suffix stops at the end of its word
+    ends = array("I", bytes(4*len(text)))
+    # suffixes are bucketed by their first letter so only one bucket's sort keys exist at a time
+    buckets = {}
+    for index in range(len(offsets) - 1):
+      end = offsets[index+1] - 1
+      for position in range(offsets[index], end):
+        ends[position] = end
+        if text[position] not in buckets:
+          buckets[text[position]] = array("I")
+        buckets[text[position]].append(position)
+
+    suffixes = array("I")
+    for first in sorted(buckets):
+      suffixes.extend(sorted(buckets.pop(first), key=lambda position: text[position:ends[position]]))
+
+    return cls(text, offsets, suffixes, source=source_stamp(source) if source != None else None)
+
+  def save(self, path=SUFFIX_ARRAY_FILE):
+    """Saves the arrays to argument path, in the layout that load maps straight into memory"""
+    offsets = array("I", self.offsets)
+    suffixes = array("I", self.suffixes)
+    if sys.byteorder != "little":
+      offsets.byteswap()
+      suffixes.byteswap()
+    text = self.text[self.base:self.base + self.offsets[-1]] if self.base != 0 else bytes(self.text)
+    padding = b"\n"*(-len(text) % 4) # keeps the suffix table 4 byte aligned
+    size, mtime = self.source if self.source != None else (0, 0)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as p:
+      p.write(HEADER.pack(MAGIC, VERSION, self.count_words, len(text) + len(padding), len(suffixes), size, mtime))
+      p.write(offsets.tobytes())
+      p.write(text + padding)
+      p.write(suffixes.tobytes())
+    os.replace(temporary, path)
+
+  @classmethod
+  def load(cls, path=SUFFIX_ARRAY_FILE):
+    """Memory maps a saved suffix array"""
+    with open(path, "rb") as p:
+      map = mmap.mmap(p.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, length, suffix_count, size, mtime = HEADER.unpack_from(map, 0)
+    if magic != MAGIC or version != VERSION:
+      map.close()
+      raise ValueError("Not a suffix array: " + str(path))
+
+    offsets_start = HEADER.size
+    text_start = offsets_start + 4*(count + 1)
+    suffixes_start = text_start + length
+    view = memoryview(map)
+    offsets = view[offsets_start:text_start]
+    suffixes = view[suffixes_start:suffixes_start + 4*suffix_count]
+    if sys.byteorder == "little":
+      offsets = offsets.cast("I")
+      suffixes = suffixes.cast("I")
+    else:
+      offsets = array("I", offsets.tobytes())
+      offsets.byteswap()
+      suffixes = array("I", suffixes.tobytes())
+      suffixes.byteswap()
+    return cls(map, offsets, suffixes, base=text_start, source=(size, mtime))
+
+  def close(self):
+    """Unmaps the file, if the suffix array was loaded from one"""
+    for view in (self.offsets, self.suffixes):
+      if isinstance(view, memoryview):
+        view.release()
+    if isinstance(self.text, mmap.mmap):
+      self.text.close()
+
+  @classmethod
+  def load_or_build(cls, path=SUFFIX_ARRAY_FILE, source=WORDS_FILE):
+    """Loads the saved suffix array, rebuilding and saving it if it is missing or out of date"""
+    try:
+      index = cls.load(path)
+    except (OSError, ValueError, struct.error):
+      index = None
+    if index != None:
+      try:
+        if index.source == source_stamp(source):
+          return index
+      except OSError:
+        pass
+      # the stale map is closed before the file is replaced under it
+      index.close()
+    index = cls.build(dictionary().get_words(), source)
+    try:
+      index.save(path)
+    except OSError:
+      pass
+    return index
+
+  def _bounds(self, pattern:bytes) -> tuple:
+    """Returns the start and end of the run of suffixes that begin with argument pattern"""
+    text = self.text
+    suffixes = self.suffixes
+    length = len(pattern)
+    base = self.base
+
+    low, high = 0, len(suffixes)
+    while low < high:
+      middle = (low + high) // 2
+      position = base + suffixes[middle]
+      if text[position:position+length] < pattern:
+        low = middle + 1
+      else:
+        high = middle
+    start = low
+
+    high = len(suffixes)
+    while low < high:
+      middle = (low + high) // 2
+      position = base + suffixes[middle]
+      if text[position:position+length] <= pattern:
+        low = middle + 1
+      else:
+        high = middle
+    return start, low
+
+  def _pattern(self, text:str) -> bytes:
+    """Returns argument text as the bytes words are stored as, or None if it has characters no word can have"""
+    text = text.strip().lower()
+    # words are stored joined by newlines, so a newline would match across the end of a word
+    if "\n" in text:
+      return None
+    try:
+      return text.encode("ascii")
+    except UnicodeEncodeError:
+      return None
+
+  def count(self, text:str) -> int:
+    """Returns how many times argument text occurs in the word list, counting repeats within a word, the empty text occurs once in every word"""
+    pattern = self._pattern(text)
+    if pattern == None:
+      return 0
+    if pattern == b"":
+      return self.count_words
+    start, end = self._bounds(pattern)
+    return end - start
+
+  def locate(self, text:str):
+    """Yields the position in the joined text of every occurrence of argument text, the start of every word for the empty text"""
+    pattern = self._pattern(text)
+    if pattern == None:
+      return
+    if pattern == b"":
+      for index in range(self.count_words):
+        yield self.offsets[index]
+      return
+    start, end = self._bounds(pattern)
+    for index in range(start, end):
+      yield self.suffixes[index]
+
+  def word_index(self, position:int) -> int:
+    """Returns the index of the word that argument position of the joined text is in"""
+    return bisect.bisect_right(self.offsets, position) - 1
+
+  def iter_solution_indexes(self, text:str):
+    """Yields the index of every word that contains argument text, in no particular order"""
+    if self._pattern(text) == b"":
+      yield from range(self.count_words)
+      return
+    seen = set()
+    for position in self.locate(text):
+      index = self.word_index(position)
+      if index not in seen:
+        seen.add(index)
+        yield index
+
+  def count_solutions(self, text:str) -> int:
+    """Returns the number of words that contain argument text"""
+    return sum(1 for _ in self.iter_solution_indexes(text))
+
+  def __getitem__(self, index):
+    return self.text[self.base + self.offsets[index]:self.base + self.offsets[index+1] - 1].decode("ascii")
+
+  def __len__(self):
+    return self.count_words
+
+  def iter_solutions(self, text:str):
+    """Yields every word that contains argument text"""
+    for index in self.iter_solution_indexes(text):
+      yield self[index]
+
+
+if __name__ == "__main__":
+  began = time.perf_counter()
+  index = SuffixArray.build(dictionary().get_words())
+  index.save()
+  built = time.perf_counter() - began
+
+  began = time.perf_counter()
+  SuffixArray.load()
+  loaded = time.perf_counter() - began
+  print(f"Built {len(index.suffixes)} suffixes in {built:.1f} s, saved to {SUFFIX_ARRAY_FILE} ({os.path.getsize(SUFFIX_ARRAY_FILE)} bytes), loads in {loaded*1000:.2f} ms")
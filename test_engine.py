@@ -0,0 +1,90 @@
+import unittest
+
+from engine import Engine, ManualClock, VALID, USED, INVALID, LOSE_LIFE, GAME_OVER
+
+
+class Prompts:
+  """Hands out prompts in order, so each turn can be told apart by its prompt"""
+  def __init__(self):
+    self.drawn = 0
+
+  def seed(self, value):
+    self.drawn = 0
+
+  def generate_prompt(self, words_used = 0, lives_lost = 0, used = ()):
+    self.drawn += 1
+    return "P" + str(self.drawn)
+
+  def use(self, word):
+    pass
+
+
+class Words:
+  """Accepts only the words it is given"""
+  def __init__(self, words):
+    self.words = set(words)
+
+  def search_word(self, text):
+    return text in self.words
+
+
+class TestEngine(unittest.TestCase):
+  def setUp(self):
+    self.clock = ManualClock(1000)
+    self.engine = Engine(Words(["AP1", "BP2", "P1X"]), Prompts(), clock=self.clock, initial_time=10, max_lives=2, seed=1)
+    self.engine.start(seed=1)
+
+  def submit(self, text):
+    self.engine.set_input(text)
+    return self.engine.submit()
+
+  def test_valid_word(self):
+    self.assertEqual(self.submit("ap1"), VALID)
+    self.assertEqual(self.engine.prompt, "P2")
+    self.assertIn("AP1", self.engine.words_used)
+
+  def test_used_word(self):
+    self.assertEqual(self.submit("ap1"), VALID)
+    self.assertEqual(self.submit("ap1"), USED)
+    self.assertEqual(self.engine.prompt, "P2")
+
+  def test_invalid_word(self):
+    self.assertEqual(self.submit("zzz"), INVALID)
+    # a real word without the prompt in it
+    self.assertEqual(self.submit("bp2"), INVALID)
+    self.assertEqual(self.engine.prompt, "P1")
+    self.assertEqual(self.engine.input, "")
+
+  def test_timer_runs_out(self):
+    self.clock.advance(9999)
+    self.assertEqual(self.engine.update(), [])
+    self.clock.advance(1)
+    self.assertEqual(self.engine.update(), [LOSE_LIFE])
+    self.assertEqual(self.engine.lives, 1)
+    self.assertEqual(self.engine.prompt, "P2")
+    self.assertEqual(self.engine.time_left, 10000)
+
+  def test_last_life_ends_game(self):
+    self.clock.advance(10000)
+    self.assertEqual(self.engine.update(), [LOSE_LIFE])
+    self.clock.advance(10000)
+    self.assertEqual(self.engine.update(), [LOSE_LIFE, GAME_OVER])
+    self.assertEqual(self.engine.state, "end")
+    self.assertEqual(self.engine.time_used, 20000)
+    self.assertEqual(self.engine.update(), [])
+
+  def test_new_prompt_resets_timer(self):
+    self.clock.advance(6000)
+    self.engine.update()
+    self.assertEqual(self.engine.time_left, 4000)
+    # time that passes without an update still belongs to the old prompt
+    self.clock.advance(3000)
+    self.engine.new_prompt()
+    self.assertEqual(self.engine.time_left, 10000)
+    self.clock.advance(2000)
+    self.assertEqual(self.engine.update(), [])
+    self.assertEqual(self.engine.time_left, 8000)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+
+from server import Player, BotPlayer, Room
+
+
+class Writer:
+  """Collects the messages sent to a player instead of writing them to a socket"""
+  def __init__(self):
+    self.lines = []
+
+  def is_closing(self):
+    return False
+
+  def write(self, data):
+    self.lines.append(data)
+
+
+class Prompts:
+  """Hands out prompts in order, so each turn can be told apart by its prompt"""
+  def __init__(self):
+    self.drawn = 0
+
+  def fork(self):
+    return self
+
+  def generate_prompt(self, words_used = 0, lives_lost = 0, used = ()):
+    self.drawn += 1
+    return "P" + str(self.drawn)
+
+  def use(self, word):
+    pass
+
+  def forget_used(self):
+    pass
+
+
+class Words:
+  """Accepts every word"""
+  def search_word(self, text):
+    return True
+
+
+class Typist:
+  """A bot that answers every prompt with the prompt and an s, 10 ms a key"""
+  def play(self, prompt, used = ()):
+    return [(10, key) for key in prompt.lower() + "s\n"]
+
+
+class TestRemove(unittest.TestCase):
+  """Removing a player in the middle of a game keeps the bomb with whoever had it"""
+
+  def play(self, names, holder, leaving, dead = ()):
+    """Starts a game between argument names, passes the bomb to argument holder then removes argument leaving"""
+    async def run():
+      room = Room("room", None, Prompts())
+      players = {name : Player(name, Writer()) for name in names}
+      for player in players.values():
+        room.add(player)
+      room.start()
+      for name in dead:
+        players[name].lives = 0
+      while room.players[room.turn].name != holder:
+        room.next_turn()
+      prompt = room.prompt
+      room.remove(players[leaving])
+      if room.timer != None:
+        room.timer.cancel()
+      return room, prompt
+    return asyncio.run(run())
+
+  def test_before_turn(self):
+    room, prompt = self.play(["a", "b", "c"], "b", "a")
+    self.assertEqual(room.players[room.turn].name, "b")
+    self.assertEqual(room.prompt, prompt)
+    self.assertEqual(room.state, "game")
+
+  def test_at_turn(self):
+    room, prompt = self.play(["a", "b", "c"], "b", "b")
+    self.assertEqual(room.players[room.turn].name, "c")
+    self.assertNotEqual(room.prompt, prompt)
+    self.assertEqual(room.state, "game")
+
+  def test_after_turn(self):
+    room, prompt = self.play(["a", "b", "c"], "b", "c")
+    self.assertEqual(room.players[room.turn].name, "b")
+    self.assertEqual(room.prompt, prompt)
+    self.assertEqual(room.state, "game")
+
+  def test_last_at_turn(self):
+    room, prompt = self.play(["a", "b", "c"], "c", "c")
+    self.assertEqual(room.players[room.turn].name, "a")
+    self.assertEqual(room.state, "game")
+
+  def test_before_turn_ends_game(self):
+    room, prompt = self.play(["a", "b", "c"], "b", "a", dead=["c"])
+    self.assertEqual(room.state, "lobby")
+
+
+class TestBots(unittest.TestCase):
+  def test_bot_answers_its_turn(self):
+    async def run():
+      room = Room("room", Words(), Prompts())
+      person = Player("a", Writer())
+      room.add(BotPlayer("bot", Typist()))
+      room.add(person)
+      room.start()
+      self.assertEqual(room.players[room.turn].name, "bot")
+      prompt = room.prompt
+      await asyncio.sleep(0.2)
+      self.assertEqual(room.words_used, {prompt + "S"})
+      self.assertIs(room.players[room.turn], person)
+      room.end()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,174 @@
+import os
+import time
+import heapq
+import string
+import argparse
+import tempfile
+import unicodedata
+from collections import Counter
+
+from words import WORDS_FILE
+
+# words are kept in memory this many at a time before being sorted and written out as a run
+CHUNK = 200000
+
+
+def normalise(line:str) -> str:
+  """Returns argument line as a word: surrounding whitespace removed, composed unicode and lower case"""
+  return unicodedata.normalize("NFC", line.strip()).lower()
+
+
+def read_words(path, alphabet:set, stats:Counter):
+  """
+  This function yields the normalised words of the list at argument path, one line at a time
+
+  Blank lines and words with characters outside argument alphabet (unless it is None) are skipped,
+  and what was skipped or changed is counted in argument stats.
+  """
+  with open(path, encoding="utf-8", errors="replace") as p:
+    for line in p:
+      stats["lines"] += 1
+      word = normalise(line)
+      if word == "":
+        stats["blank"] += 1
+        continue
+      if alphabet != None and not alphabet.issuperset(word):
+        stats["invalid"] += 1
+        continue
+      if word != line.rstrip("\r\n"):
+        stats["normalised"] += 1
+      yield word
+
+
+def write_runs(words, directory, chunk = CHUNK) -> list:
+  """Sorts argument words argument chunk at a time, writing each sorted chunk to its own file in argument directory, and returns their paths"""
+  runs = []
+  batch = set() # duplicates within a chunk are dropped before they are ever written
+  for word in words:
+    batch.add(word)
+    if len(batch) >= chunk:
+      runs.append(write_run(batch, directory, len(runs)))
+      batch = set()
+  if batch != set() or runs == []:
+    runs.append(write_run(batch, directory, len(runs)))
+  return runs
+
+
+def write_run(batch:set, directory, number:int) -> str:
+  path = os.path.join(directory, f"run {number}.txt")
+  with open(path, "w", encoding="utf-8") as p:
+    for word in sorted(batch):
+      p.write(word + "\n")
+  return path
+
+
+def read_run(path):
+  with open(path, encoding="utf-8") as p:
+    for line in p:
+      yield line[:-1]
+
+
+def merge_runs(runs):
+  """Yields every word of the sorted argument runs once, in sorted order, only holding one word of each run at a time"""
+  previous = None
+  for word in heapq.merge(*[read_run(run) for run in runs]):
+    if word != previous:
+      yield word
+      previous = word
+
+
+def sorted_words(paths, directory, alphabet:set, stats:dict, name:str, chunk = CHUNK):
+  """Yields the normalised words of every list in argument paths in sorted order without duplicates, counting them under argument name in argument stats"""
+  runs = []
+  for path in paths:
+    stats[path] = Counter()
+    folder = tempfile.mkdtemp(prefix=name + " ", dir=directory)
+    runs += write_runs(read_words(path, alphabet, stats[path]), folder, chunk)
+  return merge_runs(runs)
+
+
+def subtract(words, removed, stats:Counter, key:str):
+  """Yields the words of sorted argument words that aren't in sorted argument removed, counting those that are under argument key"""
+  removed = iter(removed)
+  next_removed = next(removed, None)
+  for word in words:
+    while next_removed != None and next_removed < word:
+      next_removed = next(removed, None)
+    if word == next_removed:
+      stats[key] += 1
+      continue
+    yield word
+
+
+def compare(words, previous, stats:Counter):
+  """Yields sorted argument words unchanged, counting how many are added and removed compared to sorted argument previous"""
+  previous = iter(previous)
+  old = next(previous, None)
+  for word in words:
+    while old != None and old < word:
+      stats["removed"] += 1
+      old = next(previous, None)
+    if word == old:
+      old = next(previous, None)
+    else:
+      stats["added"] += 1
+    yield word
+  while old != None:
+    stats["removed"] += 1
+    old = next(previous, None)
+
+
+def merge(sources, output = WORDS_FILE, banned = (), alphabet = string.ascii_lowercase, chunk = CHUNK) -> dict:
+  """
+  This function merges the word lists at argument sources into one sorted list at argument output, and returns stats on what happened
+
+  Every list is read a line at a time and sorted in chunks of argument chunk words that are written
+  to temporary files, which are then merged together. So memory stays the same however long the
+  lists are, and each word only has to be compared with the next word of each chunk.
+
+  :param banned: word lists of words to leave out
+  :type banned: list of str
+
+  :param alphabet: the characters words may use, words using any others are left out
+  :type alphabet: str
+  """
+  alphabet = set(alphabet)
+  stats = {"total" : Counter()}
+  with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as directory:
+    words = sorted_words(sources, directory, alphabet, stats, "source", chunk)
+    if len(banned) > 0:
+      words = subtract(words, sorted_words(banned, directory, alphabet, stats, "banned", chunk), stats["total"], "banned")
+    if os.path.exists(output):
+      words = compare(words, sorted_words([output], directory, None, {}, "previous", chunk), stats["total"])
+
+    temporary = output + ".tmp"
+    with open(temporary, "w", encoding="utf-8", newline="\n") as p:
+      for word in words:
+        p.write(word + "\n")
+        stats["total"]["written"] += 1
+    os.replace(temporary, output)
+
+  read = sum(stats[path]["lines"] - stats[path]["blank"] - stats[path]["invalid"] for path in sources)
+  stats["total"]["duplicates"] = read - stats["total"]["written"] - stats["total"]["banned"]
+  return stats
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Merges word lists into the sorted, de-duplicated word list the game reads")
+  parser.add_argument("sources", nargs="+", help="word lists, one word per line")
+  parser.add_argument("-o", "--output", default=WORDS_FILE, help="where the merged list is written, it can also be one of the sources")
+  parser.add_argument("-b", "--banned", nargs="*", default=(), help="lists of words to leave out")
+  parser.add_argument("-a", "--alphabet", default=string.ascii_lowercase, help="the characters words may use, the game itself only supports a to z")
+  parser.add_argument("-c", "--chunk", type=int, default=CHUNK, help="words sorted in memory at a time")
+  arguments = parser.parse_args()
+
+  began = time.perf_counter()
+  stats = merge(arguments.sources, arguments.output, arguments.banned, arguments.alphabet, arguments.chunk)
+  for path in arguments.sources + list(arguments.banned):
+    counts = stats[path]
+    print(f"{path}: {counts['lines']} lines, {counts['blank']} blank, {counts['invalid']} with invalid characters, {counts['normalised']} normalised")
+  total = stats["total"]
+  print(f"{arguments.output}: {total['written']} words written, {total['duplicates']} duplicates and {total['banned']} banned words left out")
+  if "added" in total or "removed" in total:
+    print(f"Compared to the old list: {total['added']} added, {total['removed']} removed")
+  print(f"Took {time.perf_counter() - began:.1f} s, the packed file and indexes rebuild themselves the next time they are loaded")
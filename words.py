@@ -0,0 +1,559 @@
+import os
+import re
+import hashlib
+import random
+import pickle
+import bisect
+import copy
+from collections import deque
+from array import array
+
+WORDS_FILE = "all words - sowpods + enable 1.txt"
+PROMPTS_FILE = "prompts.txt"
+INDEX_FILE = "substring index.pickle"
+PROMPT_TABLE_FILE = "prompt table.txt"
+PROMPT_TABLE_VERSION = 1
+PROMPT_COUNTS_FILE = "prompt counts.txt"
+PROMPT_COUNTS_VERSION = 1
+
+# prompts solved by at least this many words are in tier 0 (the easiest), the next threshold tier 1 and so on
+PROMPT_TIERS = (5000, 1000, 200, 50)
+
+# A prompt table is written by calibrate.py. It is a text file with a header line followed by one
+# prompt per line, easiest first:
+#
+#   # word bomb prompt table 1 tiers=5000,1000,200,50 words=272404
+#   <PROMPT> <number of words containing it> <tier>
+
+
+def read_prompt_table(path=PROMPT_TABLE_FILE) -> tuple:
+  """Returns the tier thresholds and a list of (prompt, count, tier) of a prompt table, or raises ValueError"""
+  with open(path) as p:
+    header = p.readline().split()
+    if header[0:5] != ["#", "word", "bomb", "prompt", "table"] or header[5:6] != [str(PROMPT_TABLE_VERSION)]:
+      raise ValueError("Not a prompt table: " + str(path))
+    settings = dict(setting.split("=") for setting in header[6:])
+    tiers = tuple(int(threshold) for threshold in settings["tiers"].split(","))
+    rows = []
+    for line in p:
+      text, count, tier = line.split()
+      rows.append((text, int(count), int(tier)))
+  return tiers, rows
+
+
+# Prompts from the hand written list are counted once and the counts saved, so nothing has to load
+# the substring index to sort them by difficulty. The file has a header line with a hash of the word
+# list they were counted in, so it stays valid after a fresh checkout, then one prompt per line:
+#
+#   # word bomb prompt counts 1 source=<blake2b of the word list>
+#   <PROMPT> <number of words containing it>
+
+
+def count_prompts(prompts, source=WORDS_FILE) -> dict:
+  """Returns the number of words in the word list at argument source containing each of argument prompts, reading it one line at a time"""
+  targets = {text.lower() : text for text in prompts}
+  lengths = sorted({len(text) for text in targets})
+  counts = dict.fromkeys(prompts, 0)
+  with open(source) as p:
+    for line in p:
+      word = line.strip().lower()
+      # a set so a word that contains a prompt twice is still only counted once
+      for found in {word[i:i+length] for length in lengths for i in range(len(word) - length + 1)}.intersection(targets):
+        counts[targets[found]] += 1
+  return counts
+
+
+def load_prompt_counts(prompts, path=PROMPT_COUNTS_FILE, source=WORDS_FILE) -> dict:
+  """Returns the counts of argument prompts saved at argument path, counting and saving them again if any are missing or the word list changed"""
+  with open(source, "rb") as p:
+    stamp = hashlib.blake2b(p.read(), digest_size=16).hexdigest()
+  counts = {}
+  try:
+    with open(path) as p:
+      header = p.readline().split()
+      if header == ["#", "word", "bomb", "prompt", "counts", str(PROMPT_COUNTS_VERSION), "source=" + stamp]:
+        for line in p:
+          text, count = line.split()
+          counts[text] = int(count)
+  except (OSError, ValueError):
+    counts = {}
+
+  if all(text in counts for text in prompts):
+    return {text : counts[text] for text in prompts}
+
+  counts = count_prompts(prompts, source)
+  try:
+    temporary = path + ".tmp"
+    with open(temporary, "w") as p:
+      p.write(f"# word bomb prompt counts {PROMPT_COUNTS_VERSION} source={stamp}\n")
+      for text, count in counts.items():
+        p.write(f"{text} {count}\n")
+    os.replace(temporary, path)
+  except OSError:
+    pass # a read-only install still works, it just counts every launch
+  return counts
+
+
+def source_stamp(path=WORDS_FILE) -> tuple:
+  """Returns the size and modification time of the word list, used to tell if something saved from it is stale"""
+  stat = os.stat(path)
+  return (stat.st_size, stat.st_mtime_ns)
+
+
+def words_digest(words) -> str:
+  """Returns a hash of argument words in order, so a saved index or table is only used with the words in the order it was built from"""
+  if hasattr(words, "digest"):
+    return words.digest() # packed dictionaries hash their stored words without decoding them
+  return hashlib.blake2b("".join(word + "\n" for word in words).encode(), digest_size=16).hexdigest()
+
+
+class dictionary:
+  """This class holds all of the words in the chosen dictionary"""
+  def __init__(self):
+    with open(WORDS_FILE) as p:
+      # normalises casing and drops the blank entries left by trailing newlines
+      self.words = [word.strip().lower() for word in p.read().split("\n") if word.strip() != ""]
+
+    # hash set used for constant time membership checks
+    self.lookup = frozenset(self.words)
+
+    # the substring index and sorted words are only made once something asks for them
+    self.index = None
+    self.sorted = None
+    self.features = None
+
+  def get_words(self) -> list:
+    """Returns a list of all words"""
+    return self.words
+
+  def search_word(self, text:str) -> bool:
+    """Returns a bool value depending on if argument text is in the dictionary"""
+    return text.strip().lower() in self.lookup
+
+  def contains_many(self, texts) -> list:
+    """Returns a list of bool values, one for each item in argument texts, depending on if it is in the dictionary"""
+    lookup = self.lookup
+    return [text.strip().lower() in lookup for text in texts]
+
+  def get_index(self) -> "SubstringIndex":
+    """Returns the substring index of the dictionary, loading it from disk (or building and saving it) the first time"""
+    if self.index == None:
+      self.index = SubstringIndex.load_or_build(self.words)
+    return self.index
+
+  def count_solutions(self, text:str) -> int:
+    """Returns the number of words in the dictionary that contain argument text"""
+    return self.get_index().count_solutions(text)
+
+  def get_features(self):
+    """Returns the NumPy feature table of the dictionary, loading it from disk (or building and saving it) the first time, which needs numpy"""
+    if self.features == None:
+      from features import FeatureTable # numpy is only needed by the game modes that use the table
+      self.features = FeatureTable.load_or_build(self.words)
+    return self.features
+
+  def prefix_cursor(self) -> "PrefixCursor":
+    """Returns a new PrefixCursor over the dictionary"""
+    if self.sorted == None:
+      self.sorted = sorted(self.words) # the word list is already sorted, which makes this a single pass
+    return PrefixCursor(self.sorted)
+
+  def iter_solutions(self, text:str):
+    """Yields every word in the dictionary that contains argument text"""
+    return self.get_index().iter_solutions(text)
+
+
+class prompt:
+  """
+  This class holds all possible prompts and decides which one comes next
+
+  Prompts are read from a hand written list, or from a prompt table made by calibrate.py which also
+  gives how many words solve each prompt. Prompts with known counts are sorted into difficulty tiers
+  and each draw first picks a tier, weighted by how far the game has got, from a precomputed alias
+  table, then a prompt from that tier, so a draw takes the same time however many prompts there are.
+  Recently drawn prompts and prompts with too few unused solutions left are drawn again, and each
+  prompt's used solutions are counted as words are used, so checking a prompt doesn't look at them.
+  """
+  LEVELS = 11 # steps of difficulty, each with its own alias table
+  RAMP = 5 # words used per step up in difficulty
+  EASE = 2 # steps down in difficulty for each life lost
+  HISTORY = 20 # how many of the last prompts aren't repeated
+  MINIMUM = 10 # the fewest unused solutions a prompt can be drawn with
+  ATTEMPTS = 16 # random draws before falling back to searching the tiers in order
+
+  def __init__(self, seed = None, path = PROMPTS_FILE, source = None):
+    """
+    :param path: a hand written list of prompts, or a prompt table made by calibrate.py
+    :type path: str
+
+    :param source: if given, the word list the hand written prompts are counted in, so they can be sorted by difficulty
+    :type source: str
+    """
+    self.random = random.Random(seed)
+
+    # prompt -> number of words containing it, only known for prompt tables or counted prompts
+    self.counts = {}
+    self.thresholds = PROMPT_TIERS
+
+    try:
+      self.thresholds, rows = read_prompt_table(path)
+    except (ValueError, IndexError, KeyError):
+      rows = None
+    if rows != None:
+      self.prompts = [text for text, count, tier in rows]
+      for text, count, tier in rows:
+        self.counts[text] = count
+    else:
+      with open(path) as p:
+        self.prompts = p.read()
+
+        # removes any bracketed information
+        self.prompts = re.sub("[\(\[].*?[\)\]]", "", self.prompts) # i have no idea what this function is doing :/
+
+        # removes whitespace, and the empty prompts left by blank lines which every word would solve
+        self.prompts = [prompt.strip().upper() for prompt in self.prompts.split("\n") if prompt.strip() != ""]
+      if source != None:
+        self.counts = load_prompt_counts(self.prompts, source=source)
+
+    self.history = deque(maxlen=min(self.HISTORY, len(self.prompts)//2))
+    self.recent = set()
+    self.longest = max((len(text) for text in self.counts), default=0)
+    self.forget_used()
+    self.make_tables()
+
+  def make_tables(self):
+    """Sorts the prompts into tiers and makes the alias table of every level of difficulty"""
+    self.buckets = [[] for _ in range(len(self.thresholds) + 1)]
+    for text in self.prompts:
+      self.buckets[self.tier(text)].append(text)
+    self.buckets = [bucket for bucket in self.buckets if bucket != []]
+
+    self.tables = []
+    for level in range(self.LEVELS):
+      # the weight of each tier falls away from the one that matches the level
+      centre = level/(self.LEVELS - 1)*(len(self.buckets) - 1)
+      weights = [max(0.1, 1 - abs(tier - centre)/1.5) for tier in range(len(self.buckets))]
+      self.tables.append(alias_table(weights))
+
+  def tier(self, text:str) -> int:
+    """Returns the difficulty tier of argument text, 0 is the easiest and prompts that weren't counted go in the middle"""
+    if text not in self.counts:
+      return len(self.thresholds)//2
+    for tier in range(len(self.thresholds)):
+      if self.counts[text] >= self.thresholds[tier]:
+        return tier
+    return len(self.thresholds)
+
+  def get_prompts(self) -> list:
+    """returns all possible prompts"""
+    return self.prompts
+
+  def seed(self, value):
+    """Reseeds the random prompts and forgets the recent ones, so the same seed always gives the same prompts in the same order"""
+    self.random.seed(value)
+    self.history.clear()
+    self.recent = set()
+    self.forget_used()
+
+  def forget_used(self):
+    """Forgets the used words, so every prompt has all its solutions again"""
+    self.used = set()
+    self.taken = {} # prompt -> number of used words containing it, only for counted prompts
+
+  def use(self, word:str):
+    """Takes argument word, in upper case, away from the solutions of every counted prompt it contains"""
+    if word in self.used:
+      return
+    self.used.add(word)
+    found = {word[start:end] for start in range(len(word)) for end in range(start + 1, min(len(word), start + self.longest) + 1)}
+    for text in found:
+      if text in self.counts:
+        self.taken[text] = self.taken.get(text, 0) + 1
+
+  def follow(self, used):
+    """Catches up with the words in argument used that weren't passed to use, starting over if it is a new game"""
+    if len(used) == len(self.used):
+      return
+    if not self.used <= set(used):
+      self.forget_used()
+    for word in used:
+      self.use(word)
+
+  def fork(self, seed = None) -> "prompt":
+    """Returns a prompt that shares this one's prompts and tables, but draws with its own random numbers and history"""
+    other = copy.copy(self)
+    other.random = random.Random(seed)
+    other.history = deque(maxlen=self.history.maxlen)
+    other.recent = set()
+    other.forget_used()
+    return other
+
+  def level(self, words_used:int, lives_lost:int) -> int:
+    """Returns the level of difficulty, which goes up as words are used and back down when lives are lost"""
+    return max(0, min(self.LEVELS - 1, words_used//self.RAMP - lives_lost*self.EASE))
+
+  def remaining(self, text:str) -> int:
+    """Returns how many of the words containing argument text haven't been used, or None if it was never counted"""
+    if text not in self.counts:
+      return None
+    return self.counts[text] - self.taken.get(text, 0)
+
+  def allowed(self, text:str, history = True) -> bool:
+    if history and text in self.recent:
+      return False
+    remaining = self.remaining(text)
+    return remaining == None or remaining >= self.MINIMUM
+
+  def remember(self, text:str) -> str:
+    if self.history.maxlen > 0:
+      if len(self.history) == self.history.maxlen:
+        self.recent.discard(self.history[0])
+      self.history.append(text)
+      self.recent.add(text)
+    return text
+
+  def generate_prompt(self, words_used = 0, lives_lost = 0, used = ()) -> str:
+    """
+    This function returns the next prompt
+
+    :param words_used: how many words have been used this game, more makes harder prompts likelier
+    :type words_used: int
+
+    :param lives_lost: how many lives have been lost this game, more makes easier prompts likelier
+    :type lives_lost: int
+
+    :param used: the words used so far, which can't count towards a prompt's solutions, in upper case.
+      Words already passed to use aren't looked at again, so this only costs anything for callers that don't
+    :type used: collection of str
+
+    Every prompt drawn has at least MINIMUM unused solutions, with one deliberate exception: when every
+    prompt was counted and none has that many left, the game goes on with the prompt that has the most
+    left rather than stopping, so that prompt can be below MINIMUM.
+    """
+    self.follow(used)
+    probabilities, aliases = self.tables[self.level(words_used, lives_lost)]
+    for _ in range(self.ATTEMPTS):
+      column = self.random.randrange(len(probabilities))
+      bucket = self.buckets[column if self.random.random() < probabilities[column] else aliases[column]]
+      text = bucket[self.random.randrange(len(bucket))]
+      if self.allowed(text):
+        return self.remember(text)
+
+    # unlucky, or nearly everything is ruled out, so the easiest allowed prompt is used instead
+    for history in (True, False):
+      for bucket in self.buckets:
+        for text in bucket:
+          if self.allowed(text, history):
+            return self.remember(text)
+    return self.remember(max(self.prompts, key=self.remaining))
+
+
+def alias_table(weights) -> tuple:
+  """
+  This function makes an alias table, which picks an index with probability proportional to argument weights in constant time
+
+  Returns (probabilities, aliases). To pick, choose a column uniformly at random, then keep it with
+  its probability or take its alias otherwise.
+  """
+  count = len(weights)
+  total = sum(weights)
+  scaled = [weight*count/total for weight in weights]
+  probabilities = [1.0]*count
+  aliases = list(range(count))
+  small = [column for column in range(count) if scaled[column] < 1]
+  large = [column for column in range(count) if scaled[column] >= 1]
+  while small != [] and large != []:
+    less = small.pop()
+    more = large.pop()
+    probabilities[less] = scaled[less]
+    aliases[less] = more
+    scaled[more] -= 1 - scaled[less]
+    (small if scaled[more] < 1 else large).append(more)
+  return probabilities, aliases
+
+
+class PrefixCursor:
+  """
+  This class follows a word as it is typed, knowing at each letter which words start with it
+
+  The words that start with a prefix are one run of the sorted word list, and the run for a longer
+  prefix is inside the run for a shorter one. So the sorted list works as a trie without building
+  one: adding a letter is two binary searches within the current run, and the run for every
+  shorter prefix is kept so removing a letter costs nothing.
+  """
+  def __init__(self, words):
+    """
+    :param words: every word in lower case, sorted
+    :type words: sequence of str
+    """
+    self.words = words
+    self.text = ""
+    self.runs = [(0, len(words))]
+
+  def push(self, letter:str):
+    """Adds argument letter to the end of the prefix"""
+    low, high = self.runs[-1]
+    self.text += letter.lower()
+    if low < high:
+      low = bisect.bisect_left(self.words, self.text, low, high)
+      # every word starting with the prefix sorts before the prefix with its last letter incremented
+      high = bisect.bisect_left(self.words, self.text[:-1] + chr(ord(self.text[-1]) + 1), low, high)
+    self.runs.append((low, high))
+
+  def pop(self):
+    """Removes the last letter of the prefix"""
+    if self.text != "":
+      self.text = self.text[:-1]
+      self.runs.pop()
+
+  def set(self, text:str):
+    """Moves to argument text, only redoing the letters that differ from the current prefix"""
+    text = text.lower()
+    common = 0
+    while common < min(len(text), len(self.text)) and text[common] == self.text[common]:
+      common += 1
+    while len(self.text) > common:
+      self.pop()
+    for letter in text[common:]:
+      self.push(letter)
+
+  def count(self) -> int:
+    """Returns the number of words that start with the prefix"""
+    low, high = self.runs[-1]
+    return high - low
+
+  def is_prefix(self) -> bool:
+    """Returns True if any word starts with the prefix"""
+    low, high = self.runs[-1]
+    return low < high
+
+  def is_word(self) -> bool:
+    """Returns True if the prefix is a whole word"""
+    low, high = self.runs[-1]
+    return low < high and self.words[low] == self.text
+
+
+class SubstringIndex:
+  """
+  This class maps every fragment of up to MAX_FRAGMENT letters to a posting list of the words containing it
+
+  Posting lists are arrays of word indexes in ascending order, so a prompt of up to MAX_FRAGMENT letters
+  is answered with a single dictionary lookup. Longer prompts are answered by filtering the shortest
+  posting list of their fragments.
+  """
+  MAX_FRAGMENT = 4
+  VERSION = 2
+
+  def __init__(self, words, postings):
+    self.words = words
+    self.postings = postings
+
+    # counts for prompts longer than MAX_FRAGMENT, which can't be read straight from a posting list
+    self.counts = {}
+
+  @classmethod
+  def build(cls, words):
+    """Builds the index over argument words in a single pass"""
+    postings = {}
+    for index, word in enumerate(words):
+
+      # every distinct fragment of the word, so each word is only posted once per fragment
+      fragments = set()
+      for length in range(1, cls.MAX_FRAGMENT + 1):
+        for start in range(len(word) - length + 1):
+          fragments.add(word[start:start+length])
+
+      for fragment in fragments:
+        posting = postings.get(fragment)
+        if posting == None:
+          posting = postings[fragment] = array("I")
+        posting.append(index)
+
+    return cls(words, postings)
+
+  def save(self, path=INDEX_FILE, source=WORDS_FILE):
+    """Saves the posting lists to argument path"""
+    data = {
+      "version" : self.VERSION,
+      "source" : source_stamp(source),
+      "words" : len(self.words),
+      "order" : words_digest(self.words),
+      "postings" : self.postings,
+    }
+    with open(path, "wb") as p:
+      pickle.dump(data, p, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @classmethod
+  def load(cls, words, path=INDEX_FILE, source=WORDS_FILE):
+    """Loads a saved index for argument words, returning None if it is missing or out of date"""
+    try:
+      with open(path, "rb") as p:
+        data = pickle.load(p)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      return None
+
+    if data.get("version") != cls.VERSION or data.get("words") != len(words) or data.get("source") != source_stamp(source):
+      return None
+    # the posting lists hold word numbers, so they are wrong for the same words in another order
+    if data.get("order") != words_digest(words):
+      return None
+    return cls(words, data["postings"])
+
+  @classmethod
+  def load_or_build(cls, words, path=INDEX_FILE, source=WORDS_FILE):
+    """Loads the saved index, rebuilding and saving it if it is missing or out of date"""
+    index = cls.load(words, path, source)
+    if index == None:
+      index = cls.build(words)
+      try:
+        index.save(path, source)
+      except OSError:
+        pass # a read-only install still works, it just rebuilds every launch
+    return index
+
+  def _candidates(self, text:str):
+    """Returns the shortest posting list that every solution of argument text must be in"""
+    if len(text) <= self.MAX_FRAGMENT:
+      return self.postings.get(text, ())
+    shortest = None
+    for start in range(len(text) - self.MAX_FRAGMENT + 1):
+      posting = self.postings.get(text[start:start+self.MAX_FRAGMENT], ())
+      if shortest == None or len(posting) < len(shortest):
+        shortest = posting
+    return shortest
+
+  def iter_solution_indexes(self, text:str):
+    """Yields the index of every word that contains argument text"""
+    text = text.strip().lower()
+    if len(text) <= self.MAX_FRAGMENT:
+      yield from self.postings.get(text, ()) if text != "" else range(len(self.words))
+    else:
+      words = self.words
+      for index in self._candidates(text):
+        if text in words[index]:
+          yield index
+
+  def iter_solutions(self, text:str):
+    """Yields every word that contains argument text"""
+    words = self.words
+    for index in self.iter_solution_indexes(text):
+      yield words[index]
+
+  def count_solutions(self, text:str) -> int:
+    """Returns the number of words that contain argument text"""
+    text = text.strip().lower()
+    if text == "":
+      return len(self.words)
+    if len(text) <= self.MAX_FRAGMENT:
+      return len(self.postings.get(text, ()))
+    if text not in self.counts:
+      self.counts[text] = sum(1 for _ in self.iter_solution_indexes(text))
+    return self.counts[text]
+
+
+if __name__ == "__main__":
+  # builds (or refreshes) the saved substring index ahead of time
+  words = dictionary()
+  index = SubstringIndex.build(words.get_words())
+  index.save()
+  print(f"Indexed {len(index.postings)} fragments over {len(words.get_words())} words into {INDEX_FILE}")